@@ -0,0 +1,118 @@
+import warnings
+
+import numpy as np
+
+import db
+import instrument
+import queries
+from cache import cached
+
+# Class-level competency analytics for the teacher dashboard.
+#
+# Assessment scores for a teacher's students are loaded in one query into a
+# (assessment recency x students x competencies) array, and every statistic
+# is computed column-wise with NumPy instead of looping over JSON blobs.
+# Missing scores are NaN, so a competency a student was never assessed on
+# does not drag the class average down. Results stay cached until the next
+# save_assessment for that teacher evicts them.
+
+# Scores below this (out of 100) count as needing remedial work
+BELOW_THRESHOLD = 40
+PERCENTILES = (25, 50, 75)
+# Upper bound on staleness across processes; save_assessment evicts locally
+ANALYTICS_TTL = 3600
+
+
+def load_class_scores(db_name, teacher):
+    """Return (student_ids, competencies, scores) with scores shaped (2, students, competencies)
+
+    competencies is a list of (competency_id, name) pairs in column order.
+    """
+    with db.get_connection(db_name) as conn:
+        rows = conn.execute(queries.CLASS_SCORES_SQL, (teacher,)).fetchall()
+
+    student_ids = sorted({row[0] for row in rows})
+    competencies = sorted({(row[1], row[2]) for row in rows}, key=lambda comp: comp[1])
+    scores = np.full((2, len(student_ids), len(competencies)), np.nan)
+    if not rows:
+        return student_ids, competencies, scores
+
+    student_index = {sid: i for i, sid in enumerate(student_ids)}
+    competency_index = {comp_id: j for j, (comp_id, name) in enumerate(competencies)}
+    sids, comp_ids, names, values, recency = zip(*rows)
+    scores[
+        np.fromiter(recency, dtype=np.intp, count=len(rows)),
+        np.fromiter((student_index[sid] for sid in sids), dtype=np.intp, count=len(rows)),
+        np.fromiter((competency_index[cid] for cid in comp_ids), dtype=np.intp, count=len(rows)),
+    ] = values
+    return student_ids, competencies, scores
+
+
+def summarize(scores, threshold=BELOW_THRESHOLD, percentiles=PERCENTILES):
+    """Per-competency statistics over a (2, students, competencies) score array"""
+    latest, previous = scores[0], scores[1]
+    delta = latest - previous
+
+    # All-NaN columns legitimately produce NaN; don't warn about them
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        return {
+            'assessed': np.count_nonzero(~np.isnan(latest), axis=0),
+            'mean': np.nanmean(latest, axis=0),
+            'percentiles': np.nanpercentile(latest, percentiles, axis=0),
+            'below_threshold': np.count_nonzero(latest < threshold, axis=0),
+            'mean_delta': np.nanmean(delta, axis=0),
+            'improved': np.count_nonzero(delta > 0, axis=0),
+            'declined': np.count_nonzero(delta < 0, axis=0),
+            'student_mean': np.nanmean(latest, axis=1),
+        }
+
+
+@instrument.helper
+@cached(ttl=ANALYTICS_TTL)
+def class_competency_analytics(db_name, teacher):
+    """Class statistics per competency for a teacher's students, weakest first"""
+    student_ids, competencies, scores = load_class_scores(db_name, teacher)
+    if not competencies:
+        return {'students': student_ids, 'competencies': [], 'student_mean': []}
+
+    stats = summarize(scores)
+    order = np.argsort(stats['mean'])  # NaN means sort last
+    rows = []
+    for j in order:
+        comp_id, name = competencies[j]
+        rows.append({
+            'competency_id': comp_id,
+            'competency': name,
+            'assessed': int(stats['assessed'][j]),
+            'mean': float(stats['mean'][j]),
+            'percentiles': dict(zip(PERCENTILES, stats['percentiles'][:, j].tolist())),
+            'below_threshold': int(stats['below_threshold'][j]),
+            'mean_delta': float(stats['mean_delta'][j]),
+            'improved': int(stats['improved'][j]),
+            'declined': int(stats['declined'][j]),
+        })
+    return {
+        'students': student_ids,
+        'competencies': rows,
+        'student_mean': stats['student_mean'].tolist(),
+    }
+
+
+def competency_trend(dates, scores):
+    """Least-squares slope (score points per week) and last change of one score series
+
+    dates are datetimes in ascending order; slope and last_change are None
+    until there are at least two assessments.
+    """
+    if len(scores) < 2:
+        return {'slope': None, 'last_change': None}
+
+    days = np.array([(date - dates[0]).total_seconds() / 86400 for date in dates])
+    values = np.asarray(scores, dtype=float)
+    if np.ptp(days) == 0:
+        # Same-day reassessments: no time axis to fit against
+        slope = None
+    else:
+        slope = float(np.polyfit(days, values, 1)[0] * 7)
+    return {'slope': slope, 'last_change': float(values[-1] - values[-2])}
@@ -6,6 +6,8 @@ from datetime import datetime
 import base64
 import json
 
+import db
+
 # Configure page
 st.set_page_config(
     page_title="Parent-Teacher Collaborative Platform",
@@ -17,130 +19,10 @@ st.set_page_config(
 # Database setup
 DB_NAME = "remedial_platform.db"
 
+@st.cache_resource
 def init_database():
-    """Initialize SQLite database with all required tables"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            password TEXT NOT NULL,
-            user_type TEXT NOT NULL,
-            full_name TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Students table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS students (
-            student_id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            grade TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            parent TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (teacher) REFERENCES users(username),
-            FOREIGN KEY (parent) REFERENCES users(username)
-        )
-    ''')
-    
-    # Assessments table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS assessments (
-            assessment_id TEXT PRIMARY KEY,
-            student_id TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            competencies TEXT NOT NULL,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES students(student_id),
-            FOREIGN KEY (teacher) REFERENCES users(username)
-        )
-    ''')
-    
-    # Materials table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS materials (
-            material_id TEXT PRIMARY KEY,
-            student_id TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            competency TEXT NOT NULL,
-            title TEXT NOT NULL,
-            description TEXT,
-            file_data BLOB NOT NULL,
-            filename TEXT NOT NULL,
-            duration_days INTEGER NOT NULL,
-            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES students(student_id),
-            FOREIGN KEY (teacher) REFERENCES users(username)
-        )
-    ''')
-    
-    # Progress table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS progress (
-            progress_id TEXT PRIMARY KEY,
-            student_id TEXT NOT NULL,
-            material_id TEXT NOT NULL,
-            parent TEXT NOT NULL,
-            completed BOOLEAN DEFAULT FALSE,
-            completed_at TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES students(student_id),
-            FOREIGN KEY (material_id) REFERENCES materials(material_id),
-            FOREIGN KEY (parent) REFERENCES users(username)
-        )
-    ''')
-    
-    # Feedback table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            feedback_id TEXT PRIMARY KEY,
-            progress_id TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            student_id TEXT NOT NULL,
-            feedback TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (progress_id) REFERENCES progress(progress_id),
-            FOREIGN KEY (teacher) REFERENCES users(username),
-            FOREIGN KEY (student_id) REFERENCES students(student_id)
-        )
-    ''')
-    
-    # Daily progress tracking table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_progress (
-            daily_progress_id TEXT PRIMARY KEY,
-            material_id TEXT NOT NULL,
-            student_id TEXT NOT NULL,
-            parent TEXT NOT NULL,
-            day_number INTEGER NOT NULL,
-            completed BOOLEAN DEFAULT FALSE,
-            parent_comments TEXT,
-            completed_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (material_id) REFERENCES materials(material_id),
-            FOREIGN KEY (student_id) REFERENCES students(student_id),
-            FOREIGN KEY (parent) REFERENCES users(username)
-        )
-    ''')
-
-    # Teacher feedback on daily progress
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_feedback (
-            daily_feedback_id TEXT PRIMARY KEY,
-            daily_progress_id TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            feedback TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (daily_progress_id) REFERENCES daily_progress(daily_progress_id),
-            FOREIGN KEY (teacher) REFERENCES users(username)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    """Create or upgrade the database schema (runs once per process)"""
+    return db.migrate(DB_NAME)
 
 # Initialize session state
 if 'logged_in' not in st.session_state:
@@ -156,31 +38,26 @@ def hash_password(password):
 
 def create_user(username, password, user_type, full_name):
     """Create a new user in the database"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            INSERT INTO users (username, password, user_type, full_name)
-            VALUES (?, ?, ?, ?)
-        ''', (username, hash_password(password), user_type, full_name))
-        conn.commit()
-        conn.close()
+        with db.get_connection(DB_NAME) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO users (username, password, user_type, full_name)
+                VALUES (?, ?, ?, ?)
+            ''', (username, hash_password(password), user_type, full_name))
         return True
     except sqlite3.IntegrityError:
-        conn.close()
         return False
 
 def authenticate_user(username, password):
     """Authenticate user credentials"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT password, user_type FROM users WHERE username = ?
-    ''', (username,))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute('''
+            SELECT password, user_type FROM users WHERE username = ?
+        ''', (username,))
+        result = cursor.fetchone()
     
     if result and result[0] == hash_password(password):
         return True, result[1]
@@ -188,92 +65,84 @@ def authenticate_user(username, password):
 
 def get_user_info(username):
     """Get user information"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT full_name, user_type FROM users WHERE username = ?
-    ''', (username,))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute('''
+            SELECT full_name, user_type FROM users WHERE username = ?
+        ''', (username,))
+        result = cursor.fetchone()
     
     return result
 
 def get_user_students(username, user_type):
     """Get students associated with a user"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    if user_type == 'teacher':
-        cursor.execute('''
-            SELECT student_id FROM students WHERE teacher = ?
-        ''', (username,))
-    elif user_type == 'parent':
-        cursor.execute('''
-            SELECT student_id FROM students WHERE parent = ?
-        ''', (username,))
+        if user_type == 'teacher':
+            cursor.execute('''
+                SELECT student_id FROM students WHERE teacher = ?
+            ''', (username,))
+        elif user_type == 'parent':
+            cursor.execute('''
+                SELECT student_id FROM students WHERE parent = ?
+            ''', (username,))
     
-    results = cursor.fetchall()
-    conn.close()
+        results = cursor.fetchall()
     
     return [row[0] for row in results]
 
 def add_student(student_id, name, grade, teacher, parent):
     """Add a new student to the database"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            INSERT INTO students (student_id, name, grade, teacher, parent)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (student_id, name, grade, teacher, parent))
-        conn.commit()
-        conn.close()
+        with db.get_connection(DB_NAME) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO students (student_id, name, grade, teacher, parent)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (student_id, name, grade, teacher, parent))
         return True
     except sqlite3.IntegrityError:
-        conn.close()
         return False
 
 def get_student_info(student_id):
     """Get student information"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT name, grade, teacher, parent FROM students WHERE student_id = ?
-    ''', (student_id,))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute('''
+            SELECT name, grade, teacher, parent FROM students WHERE student_id = ?
+        ''', (student_id,))
+        result = cursor.fetchone()
     
     return result
 
 def save_assessment(assessment_id, student_id, teacher, competencies, notes):
     """Save competency assessment"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        INSERT INTO assessments (assessment_id, student_id, teacher, competencies, notes)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (assessment_id, student_id, teacher, json.dumps(competencies), notes))
+        cursor.execute('''
+            INSERT INTO assessments (assessment_id, student_id, teacher, competencies, notes)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (assessment_id, student_id, teacher, json.dumps(competencies), notes))
     
-    conn.commit()
-    conn.close()
+        # Same score rows as app5, so its history and class analytics see these too
+        db.insert_assessment_scores(conn, assessment_id, competencies)
 
 def get_latest_assessment(student_id):
     """Get the latest assessment for a student"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT competencies, notes, created_at FROM assessments 
-        WHERE student_id = ? 
-        ORDER BY created_at DESC 
-        LIMIT 1
-    ''', (student_id,))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute('''
+            SELECT competencies, notes, created_at FROM assessments 
+            WHERE student_id = ? 
+            ORDER BY created_at DESC 
+            LIMIT 1
+        ''', (student_id,))
+        result = cursor.fetchone()
     
     if result:
         return {
@@ -285,29 +154,33 @@ def get_latest_assessment(student_id):
 
 def save_material(material_id, student_id, teacher, competency, title, description, file_data, filename, duration_days):
     """Save learning material with duration"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO materials (material_id, student_id, teacher, competency, title, description, file_data, filename, duration_days)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (material_id, student_id, teacher, competency, title, description, file_data, filename, duration_days))
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    conn.commit()
-    conn.close()
+        # PDFs live in the shared content-addressed store, one copy per distinct file
+        content_hash = hashlib.sha256(file_data).hexdigest()
+        cursor.execute('''
+            INSERT OR IGNORE INTO material_blobs (content_hash, file_data, size)
+            VALUES (?, ?, ?)
+        ''', (content_hash, file_data, len(file_data)))
+        cursor.execute('''
+            INSERT INTO materials (material_id, student_id, teacher, competency, title, description, content_hash, filename, duration_days)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (material_id, student_id, teacher, competency, title, description, content_hash, filename, duration_days))
 
 def get_student_materials(student_id):
     """Get all materials for a student"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT material_id, competency, title, description, file_data, filename, duration_days, uploaded_at
-        FROM materials WHERE student_id = ?
-        ORDER BY uploaded_at DESC
-    ''', (student_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute('''
+            SELECT m.material_id, m.competency, m.title, m.description, b.file_data, m.filename, m.duration_days, m.uploaded_at
+            FROM materials m
+            JOIN material_blobs b ON b.content_hash = m.content_hash
+            WHERE m.student_id = ?
+            ORDER BY m.uploaded_at DESC
+        ''', (student_id,))
+        results = cursor.fetchall()
     
     return [{
         'material_id': row[0],
@@ -322,51 +195,46 @@ def get_student_materials(student_id):
 
 def save_progress(progress_id, student_id, material_id, parent, completed=False):
     """Save or update progress"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    if completed:
-        cursor.execute('''
-            INSERT OR REPLACE INTO progress (progress_id, student_id, material_id, parent, completed, completed_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (progress_id, student_id, material_id, parent, completed, datetime.now()))
-    else:
-        cursor.execute('''
-            INSERT OR REPLACE INTO progress (progress_id, student_id, material_id, parent, completed)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (progress_id, student_id, material_id, parent, completed))
-    
-    conn.commit()
-    conn.close()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        if completed:
+            cursor.execute('''
+                INSERT OR REPLACE INTO progress (progress_id, student_id, material_id, parent, completed, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (progress_id, student_id, material_id, parent, completed, datetime.now()))
+        else:
+            cursor.execute('''
+                INSERT OR REPLACE INTO progress (progress_id, student_id, material_id, parent, completed)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (progress_id, student_id, material_id, parent, completed))
 
 def get_progress(student_id, material_id):
     """Get progress for a specific material"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT completed, completed_at FROM progress 
-        WHERE student_id = ? AND material_id = ?
-    ''', (student_id, material_id))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute('''
+            SELECT completed, completed_at FROM progress 
+            WHERE student_id = ? AND material_id = ?
+        ''', (student_id, material_id))
+        result = cursor.fetchone()
     
     return result
 
 def get_student_progress(student_id):
     """Get all progress for a student"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT p.progress_id, p.material_id, p.completed, p.completed_at, m.title, m.competency
-        FROM progress p
-        JOIN materials m ON p.material_id = m.material_id
-        WHERE p.student_id = ?
-        ORDER BY p.completed_at DESC
-    ''', (student_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute('''
+            SELECT p.progress_id, p.material_id, p.completed, p.completed_at, m.title, m.competency
+            FROM progress p
+            JOIN materials m ON p.material_id = m.material_id
+            WHERE p.student_id = ?
+            ORDER BY p.completed_at DESC
+        ''', (student_id,))
+        results = cursor.fetchall()
     
     return [{
         'progress_id': row[0],
@@ -379,29 +247,25 @@ def get_student_progress(student_id):
 
 def save_feedback(feedback_id, progress_id, teacher, student_id, feedback):
     """Save teacher feedback"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        INSERT INTO feedback (feedback_id, progress_id, teacher, student_id, feedback)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (feedback_id, progress_id, teacher, student_id, feedback))
-    
-    conn.commit()
-    conn.close()
+        cursor.execute('''
+            INSERT INTO feedback (feedback_id, progress_id, teacher, student_id, feedback)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (feedback_id, progress_id, teacher, student_id, feedback))
 
 def get_feedback(progress_id):
     """Get feedback for a progress item"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT feedback, created_at FROM feedback 
-        WHERE progress_id = ?
-        ORDER BY created_at DESC
-    ''', (progress_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute('''
+            SELECT feedback, created_at FROM feedback 
+            WHERE progress_id = ?
+            ORDER BY created_at DESC
+        ''', (progress_id,))
+        results = cursor.fetchall()
     
     return [{
         'feedback': row[0],
@@ -410,18 +274,17 @@ def get_feedback(progress_id):
 
 def get_completed_activities(student_id):
     """Get completed activities for feedback"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT p.progress_id, m.title, m.competency, p.completed_at
-        FROM progress p
-        JOIN materials m ON p.material_id = m.material_id
-        WHERE p.student_id = ? AND p.completed = 1
-        ORDER BY p.completed_at DESC
-    ''', (student_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute('''
+            SELECT p.progress_id, m.title, m.competency, p.completed_at
+            FROM progress p
+            JOIN materials m ON p.material_id = m.material_id
+            WHERE p.student_id = ? AND p.completed = 1
+            ORDER BY p.completed_at DESC
+        ''', (student_id,))
+        results = cursor.fetchall()
     
     return [{
         'progress_id': row[0],
@@ -452,36 +315,32 @@ def validate_file_type(file):
 
 def save_daily_progress(daily_progress_id, material_id, student_id, parent, day_number, completed=False, parent_comments=None):
     """Save daily progress for a material"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    if completed:
-        cursor.execute('''
-            INSERT OR REPLACE INTO daily_progress (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments, completed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments, datetime.now()))
-    else:
-        cursor.execute('''
-            INSERT OR REPLACE INTO daily_progress (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments))
-    
-    conn.commit()
-    conn.close()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        if completed:
+            cursor.execute('''
+                INSERT OR REPLACE INTO daily_progress (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments, datetime.now()))
+        else:
+            cursor.execute('''
+                INSERT OR REPLACE INTO daily_progress (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments))
 
 def get_daily_progress(material_id, student_id):
     """Get daily progress for a material"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT daily_progress_id, day_number, completed, parent_comments, completed_at
-        FROM daily_progress 
-        WHERE material_id = ? AND student_id = ?
-        ORDER BY day_number
-    ''', (material_id, student_id))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute('''
+            SELECT daily_progress_id, day_number, completed, parent_comments, completed_at
+            FROM daily_progress 
+            WHERE material_id = ? AND student_id = ?
+            ORDER BY day_number
+        ''', (material_id, student_id))
+        results = cursor.fetchall()
     
     return [{
         'daily_progress_id': row[0],
@@ -493,29 +352,25 @@ def get_daily_progress(material_id, student_id):
 
 def save_daily_feedback(daily_feedback_id, daily_progress_id, teacher, feedback):
     """Save teacher feedback on daily progress"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        INSERT INTO daily_feedback (daily_feedback_id, daily_progress_id, teacher, feedback)
-        VALUES (?, ?, ?, ?)
-    ''', (daily_feedback_id, daily_progress_id, teacher, feedback))
-    
-    conn.commit()
-    conn.close()
+        cursor.execute('''
+            INSERT INTO daily_feedback (daily_feedback_id, daily_progress_id, teacher, feedback)
+            VALUES (?, ?, ?, ?)
+        ''', (daily_feedback_id, daily_progress_id, teacher, feedback))
 
 def get_daily_feedback(daily_progress_id):
     """Get teacher feedback for daily progress"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT feedback, created_at FROM daily_feedback 
-        WHERE daily_progress_id = ?
-        ORDER BY created_at DESC
-    ''', (daily_progress_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute('''
+            SELECT feedback, created_at FROM daily_feedback 
+            WHERE daily_progress_id = ?
+            ORDER BY created_at DESC
+        ''', (daily_progress_id,))
+        results = cursor.fetchall()
     
     return [{
         'feedback': row[0],
@@ -524,19 +379,18 @@ def get_daily_feedback(daily_progress_id):
 
 def get_student_daily_progress_summary(student_id):
     """Get summary of daily progress for teacher review"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT dp.daily_progress_id, dp.material_id, dp.day_number, dp.completed, 
-               dp.parent_comments, dp.completed_at, m.title, m.competency
-        FROM daily_progress dp
-        JOIN materials m ON dp.material_id = m.material_id
-        WHERE dp.student_id = ?
-        ORDER BY m.uploaded_at DESC, dp.day_number
-    ''', (student_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute('''
+            SELECT dp.daily_progress_id, dp.material_id, dp.day_number, dp.completed, 
+                   dp.parent_comments, dp.completed_at, m.title, m.competency
+            FROM daily_progress dp
+            JOIN materials m ON dp.material_id = m.material_id
+            WHERE dp.student_id = ?
+            ORDER BY m.uploaded_at DESC, dp.day_number
+        ''', (student_id,))
+        results = cursor.fetchall()
     
     return [{
         'daily_progress_id': row[0],
@@ -1,12 +1,26 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import sqlite3
 import hashlib
 import os
 from datetime import datetime, timedelta
 import base64
+import io
 import json
+import math
 import uuid
 import re
+import threading
+import time
+
+import analytics
+import catalog
+import db
+import instrument
+import metrics
+import profiling
+import queries
+from cache import cached, get_cache
 
 # Add at the top
 IS_DEPLOYED = os.getenv('STREAMLIT_RUNTIME_ENV') == 'cloud'
@@ -17,6 +31,9 @@ if IS_DEPLOYED:
 else:
     SESSION_DURATION_DAYS = 7
 
+# Comma-separated usernames allowed to see the diagnostics panel
+ADMIN_USERS = {u.strip() for u in os.getenv('ADMIN_USERS', '').split(',') if u.strip()}
+
 
 # Configure page
 st.set_page_config(
@@ -27,188 +44,56 @@ st.set_page_config(
 )
 
 # Database setup
-DB_NAME = os.path.join(os.path.dirname(__file__), "remedial_platform.db")
+# REMEDIAL_DB_PATH points the app at another database, e.g. a seeded benchmark copy
+DB_NAME = os.getenv('REMEDIAL_DB_PATH', os.path.join(os.path.dirname(__file__), "remedial_platform.db"))
 
+@st.cache_resource
 def init_database():
-    """Initialize SQLite database with all required tables"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            password TEXT NOT NULL,
-            user_type TEXT NOT NULL,
-            full_name TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Students table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS students (
-            student_id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            grade TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            parent TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (teacher) REFERENCES users(username),
-            FOREIGN KEY (parent) REFERENCES users(username)
-        )
-    ''')
-    
-    # Assessments table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS assessments (
-            assessment_id TEXT PRIMARY KEY,
-            student_id TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            competencies TEXT NOT NULL,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES students(student_id),
-            FOREIGN KEY (teacher) REFERENCES users(username)
-        )
-    ''')
-    
-    # Materials table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS materials (
-            material_id TEXT PRIMARY KEY,
-            student_id TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            competency TEXT NOT NULL,
-            title TEXT NOT NULL,
-            description TEXT,
-            file_data BLOB NOT NULL,
-            filename TEXT NOT NULL,
-            duration_days INTEGER NOT NULL,
-            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES students(student_id),
-            FOREIGN KEY (teacher) REFERENCES users(username)
-        )
-    ''')
-    
-    # Progress table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS progress (
-            progress_id TEXT PRIMARY KEY,
-            student_id TEXT NOT NULL,
-            material_id TEXT NOT NULL,
-            parent TEXT NOT NULL,
-            completed BOOLEAN DEFAULT FALSE,
-            completed_at TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES students(student_id),
-            FOREIGN KEY (material_id) REFERENCES materials(material_id),
-            FOREIGN KEY (parent) REFERENCES users(username)
-        )
-    ''')
-    
-    # Feedback table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            feedback_id TEXT PRIMARY KEY,
-            progress_id TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            student_id TEXT NOT NULL,
-            feedback TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (progress_id) REFERENCES progress(progress_id),
-            FOREIGN KEY (teacher) REFERENCES users(username),
-            FOREIGN KEY (student_id) REFERENCES students(student_id)
-        )
-    ''')
-    
-    # Daily progress tracking table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_progress (
-            daily_progress_id TEXT PRIMARY KEY,
-            material_id TEXT NOT NULL,
-            student_id TEXT NOT NULL,
-            parent TEXT NOT NULL,
-            day_number INTEGER NOT NULL,
-            completed BOOLEAN DEFAULT FALSE,
-            parent_comments TEXT,
-            completed_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (material_id) REFERENCES materials(material_id),
-            FOREIGN KEY (student_id) REFERENCES students(student_id),
-            FOREIGN KEY (parent) REFERENCES users(username)
-        )
-    ''')
-
-    # Teacher feedback on daily progress
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_feedback (
-            daily_feedback_id TEXT PRIMARY KEY,
-            daily_progress_id TEXT NOT NULL,
-            teacher TEXT NOT NULL,
-            feedback TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (daily_progress_id) REFERENCES daily_progress(daily_progress_id),
-            FOREIGN KEY (teacher) REFERENCES users(username)
-        )
-    ''')
-
-    # Add sessions table for persistent login
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id TEXT PRIMARY KEY,
-            username TEXT NOT NULL,
-            user_type TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            expires_at TIMESTAMP NOT NULL,
-            FOREIGN KEY (username) REFERENCES users(username)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    """Create or upgrade the database schema (runs once per process)"""
+    return db.migrate(DB_NAME)
+
+@st.cache_resource
+def load_competency_catalog():
+    """Competency catalog with integer IDs (loaded once per process)"""
+    return catalog.load_catalog(DB_NAME)
 
 # Helper functions
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
+@instrument.helper
 def authenticate_user(username, password):
     """Authenticate user against database"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT user_type FROM users 
-        WHERE username = ? AND password = ?
-    ''', (username, hash_password(password)))
+        cursor.execute(queries.AUTHENTICATE_USER_SQL, (username, hash_password(password)))
     
-    result = cursor.fetchone()
-    conn.close()
+        result = cursor.fetchone()
     
     if result:
         return True, result[0]  # Return (is_authenticated, user_type)
     return False, None
 
+@instrument.helper
 def create_user(username, password, user_type, full_name):
     """Create a new user in the database"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            INSERT INTO users (username, password, user_type, full_name)
-            VALUES (?, ?, ?, ?)
-        ''', (username, hash_password(password), user_type, full_name))
-        conn.commit()
-        conn.close()
+        with db.get_connection(DB_NAME) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO users (username, password, user_type, full_name)
+                VALUES (?, ?, ?, ?)
+            ''', (username, hash_password(password), user_type, full_name))
         return True
     except sqlite3.IntegrityError:
-        conn.close()
         return False
 
 # Modified authentication function
 def authenticate_user_with_session(username, password):
     """Authenticate user and create session"""
     is_authenticated, user_type = authenticate_user(username, password)
+    metrics.LOGIN_ATTEMPTS.inc(result='success' if is_authenticated else 'failure')
     
     if is_authenticated:
         session_id = create_session(username, user_type)
@@ -221,94 +106,136 @@ def authenticate_user_with_session(username, password):
     
     return False, None
 
+# Lookups memoized for the duration of a single rerun; reset by main()
+_request_cache = {}
+
+def reset_request_cache():
+    """Forget the lookups memoized during the previous rerun"""
+    _request_cache.clear()
+
+@instrument.helper
 def get_user_info(username):
-    """Get user information"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    """Get user information (memoized for the current rerun)"""
+    users = _request_cache.setdefault('users', {})
+    if username in users:
+        return users[username]
     
-    cursor.execute('''
-        SELECT full_name, user_type FROM users WHERE username = ?
-    ''', (username,))
-    result = cursor.fetchone()
-    conn.close()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.USER_INFO_SQL, (username,))
+        result = cursor.fetchone()
     
+    # Unknown users are not memoized, they may register within this rerun
+    if result:
+        users[username] = result
     return result
 
+# Cross-session cache lifetimes (seconds) for read helpers; the matching
+# writers evict their keys, the TTL only bounds staleness across processes
+STUDENTS_TTL = 300
+ASSESSMENT_TTL = 300
+PROGRESS_TTL = 120
+DAILY_PROGRESS_TTL = 60
+# Validated sessions are cached briefly; logout evicts its own entry
+SESSION_CACHE_TTL = 60
+# How often the background sweeper purges expired sessions
+SESSION_SWEEP_INTERVAL = 15 * 60
+
+@instrument.helper
+@cached(ttl=STUDENTS_TTL)
 def get_user_students(username, user_type):
     """Get students associated with a user"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    if user_type == 'teacher':
-        cursor.execute('''
-            SELECT student_id FROM students WHERE teacher = ?
-        ''', (username,))
-    elif user_type == 'parent':
-        cursor.execute('''
-            SELECT student_id FROM students WHERE parent = ?
-        ''', (username,))
+        if user_type in queries.USER_STUDENTS_SQL:
+            cursor.execute(queries.USER_STUDENTS_SQL[user_type], (username,))
     
-    results = cursor.fetchall()
-    conn.close()
+        results = cursor.fetchall()
     
     return [row[0] for row in results]
 
+@instrument.helper
 def add_student(student_id, name, grade, teacher, parent):
     """Add a new student to the database"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            INSERT INTO students (student_id, name, grade, teacher, parent)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (student_id, name, grade, teacher, parent))
-        conn.commit()
-        conn.close()
-        return True
+        with db.get_connection(DB_NAME) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO students (student_id, name, grade, teacher, parent)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (student_id, name, grade, teacher, parent))
     except sqlite3.IntegrityError:
-        conn.close()
         return False
+    
+    get_user_students.invalidate(teacher, 'teacher')
+    get_user_students.invalidate(parent, 'parent')
+    return True
+
+@instrument.helper
+def load_student_directory():
+    """Load name, grade, teacher and parent of all the current user's students in one query"""
+    username = st.session_state.get('current_user')
+    user_type = st.session_state.get('user_type')
+    if not st.session_state.get('logged_in') or user_type not in ('teacher', 'parent'):
+        return {}
+    
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.STUDENT_DIRECTORY_SQL[user_type], (username,))
+        results = cursor.fetchall()
+    
+    return {row[0]: row[1:] for row in results}
 
+@instrument.helper
 def get_student_info(student_id):
-    """Get student information"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    """Get student information (served from the per-rerun student directory)"""
+    students = _request_cache.get('students')
+    if students is None:
+        students = _request_cache['students'] = load_student_directory()
+    if student_id in students:
+        return students[student_id]
     
-    cursor.execute('''
-        SELECT name, grade, teacher, parent FROM students WHERE student_id = ?
-    ''', (student_id,))
-    result = cursor.fetchone()
-    conn.close()
+    # Not one of the current user's students (or added during this rerun)
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.STUDENT_INFO_SQL, (student_id,))
+        result = cursor.fetchone()
     
+    if result:
+        students[student_id] = result
     return result
 
+@instrument.helper
 def save_assessment(assessment_id, student_id, teacher, competencies, notes):
     """Save competency assessment"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        INSERT INTO assessments (assessment_id, student_id, teacher, competencies, notes)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (assessment_id, student_id, teacher, json.dumps(competencies), notes))
+        cursor.execute('''
+            INSERT INTO assessments (assessment_id, student_id, teacher, competencies, notes)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (assessment_id, student_id, teacher, json.dumps(competencies), notes))
+    
+        # One row per competency, read by the history and class analytics
+        db.insert_assessment_scores(conn, assessment_id, competencies)
     
-    conn.commit()
-    conn.close()
+    get_latest_assessment.invalidate(student_id)
+    get_assessment_history.invalidate(student_id)
+    analytics.class_competency_analytics.invalidate(DB_NAME, teacher)
 
+@instrument.helper
+@cached(ttl=ASSESSMENT_TTL)
 def get_latest_assessment(student_id):
     """Get the latest assessment for a student"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT competencies, notes, created_at FROM assessments 
-        WHERE student_id = ? 
-        ORDER BY created_at DESC 
-        LIMIT 1
-    ''', (student_id,))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute(queries.LATEST_ASSESSMENT_SQL, (student_id,))
+        result = cursor.fetchone()
     
     if result:
         return {
@@ -318,90 +245,165 @@ def get_latest_assessment(student_id):
         }
     return None
 
-def save_material(material_id, student_id, teacher, competency, title, description, file_data, filename, duration_days):
-    """Save learning material with duration"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+@instrument.helper
+@cached(ttl=ASSESSMENT_TTL)
+def get_assessment_history(student_id):
+    """Every assessed score for a student, grouped by competency with its trend"""
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.ASSESSMENT_HISTORY_SQL, (student_id,))
+        results = cursor.fetchall()
+    
+    history = {}
+    for created_at, competency, score in results:
+        series = history.setdefault(competency, {'dates': [], 'scores': []})
+        series['dates'].append(datetime.fromisoformat(created_at))
+        series['scores'].append(score)
+    
+    for series in history.values():
+        series.update(analytics.competency_trend(series['dates'], series['scores']))
+    return history
+
+def store_material_file(conn, file_data):
+    """Store a PDF once per distinct content and return its SHA-256 content hash"""
+    stream = io.BytesIO(file_data) if isinstance(file_data, (bytes, bytearray)) else file_data
+    content_hash = db.hash_stream(stream)
+    size = db.stream_size(stream)
     
+    # A duplicate upload stops here: the blob row already exists
+    cursor = conn.cursor()
     cursor.execute('''
-        INSERT INTO materials (material_id, student_id, teacher, competency, title, description, file_data, filename, duration_days)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (material_id, student_id, teacher, competency, title, description, file_data, filename, duration_days))
+        INSERT OR IGNORE INTO material_blobs (content_hash, file_data, size)
+        VALUES (?, zeroblob(?), ?)
+    ''', (content_hash, size, size))
+    if cursor.rowcount:
+        # Stream the file into the reserved space in chunks
+        db.write_blob(conn, 'material_blobs', 'file_data', cursor.lastrowid, stream)
+    
+    return content_hash
+
+@instrument.helper
+def save_material(material_id, student_id, teacher, competency, title, description, file_data, filename, duration_days):
+    """Save learning material with duration; file_data may be bytes or a file-like object"""
+    with db.get_connection(DB_NAME) as conn:
+        content_hash = store_material_file(conn, file_data)
+        cursor = conn.cursor()
     
-    conn.commit()
-    conn.close()
+        cursor.execute('''
+            INSERT INTO materials (material_id, student_id, teacher, competency, title, description, content_hash, filename, duration_days)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (material_id, student_id, teacher, competency, title, description, content_hash, filename, duration_days))
 
+@instrument.helper
+def assign_material(student_ids, teacher, competency, title, description, file_data, filename, duration_days):
+    """Store one PDF and assign it to several students in a single transaction"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    material_ids = {sid: f"{sid}_{competency.replace(' ', '_')}_{timestamp}" for sid in student_ids}
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.in_list(queries.OWN_STUDENTS_SQL, len(student_ids)), (teacher, *student_ids))
+        own_students = {row[0] for row in cursor.fetchall()}
+    
+        cursor.execute(queries.in_list(queries.EXISTING_MATERIALS_SQL, len(material_ids)),
+                       tuple(material_ids.values()))
+        existing = {row[0] for row in cursor.fetchall()}
+    
+        results = []
+        rows = []
+        for sid in student_ids:
+            result = {'student_id': sid, 'material_id': material_ids[sid], 'assigned': False}
+            if sid not in own_students:
+                result['message'] = "Not one of your students"
+            elif material_ids[sid] in existing:
+                result['message'] = "Already assigned"
+            else:
+                result['assigned'] = True
+                result['message'] = "Assigned"
+                rows.append(sid)
+            results.append(result)
+    
+        if rows:
+            # The file is stored once; every student only costs a small assignment row
+            content_hash = store_material_file(conn, file_data)
+            cursor.executemany('''
+                INSERT INTO materials (material_id, student_id, teacher, competency, title, description, content_hash, filename, duration_days)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(material_ids[sid], sid, teacher, competency, title, description, content_hash, filename, duration_days)
+                  for sid in rows])
+    
+    return results
+
+@instrument.helper
 def get_student_materials(student_id):
-    """Get all materials for a student"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    """Get all materials for a student (metadata only, see get_material_file)"""
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT material_id, competency, title, description, file_data, filename, duration_days, uploaded_at
-        FROM materials WHERE student_id = ?
-        ORDER BY uploaded_at DESC
-    ''', (student_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute(queries.STUDENT_MATERIALS_SQL, (student_id,))
+        results = cursor.fetchall()
     
     return [{
         'material_id': row[0],
         'competency': row[1],
         'title': row[2],
         'description': row[3],
-        'file_data': row[4],
-        'filename': row[5],
-        'duration_days': row[6],
-        'uploaded_at': row[7]
+        'filename': row[4],
+        'duration_days': row[5],
+        'uploaded_at': row[6]
     } for row in results]
 
+@instrument.helper
+def get_material_file(material_id):
+    """Get the PDF bytes of a single material, only when a download is requested"""
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.MATERIAL_FILE_SQL, (material_id,))
+        result = cursor.fetchone()
+    
+    return result[0] if result else None
+
+@instrument.helper
 def save_progress(progress_id, student_id, material_id, parent, completed=False):
     """Save or update progress"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    if completed:
-        cursor.execute('''
-            INSERT OR REPLACE INTO progress (progress_id, student_id, material_id, parent, completed, completed_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (progress_id, student_id, material_id, parent, completed, datetime.now()))
-    else:
-        cursor.execute('''
-            INSERT OR REPLACE INTO progress (progress_id, student_id, material_id, parent, completed)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (progress_id, student_id, material_id, parent, completed))
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        if completed:
+            cursor.execute('''
+                INSERT OR REPLACE INTO progress (progress_id, student_id, material_id, parent, completed, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (progress_id, student_id, material_id, parent, completed, datetime.now()))
+        else:
+            cursor.execute('''
+                INSERT OR REPLACE INTO progress (progress_id, student_id, material_id, parent, completed)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (progress_id, student_id, material_id, parent, completed))
     
-    conn.commit()
-    conn.close()
+    get_student_progress.invalidate(student_id)
 
+@instrument.helper
 def get_progress(student_id, material_id):
     """Get progress for a specific material"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT completed, completed_at FROM progress 
-        WHERE student_id = ? AND material_id = ?
-    ''', (student_id, material_id))
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute(queries.PROGRESS_SQL, (student_id, material_id))
+        result = cursor.fetchone()
     
     return result
 
+@instrument.helper
+@cached(ttl=PROGRESS_TTL)
 def get_student_progress(student_id):
     """Get all progress for a student"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT p.progress_id, p.material_id, p.completed, p.completed_at, m.title, m.competency
-        FROM progress p
-        JOIN materials m ON p.material_id = m.material_id
-        WHERE p.student_id = ?
-        ORDER BY p.completed_at DESC
-    ''', (student_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute(queries.STUDENT_PROGRESS_SQL, (student_id,))
+        results = cursor.fetchall()
     
     return [{
         'progress_id': row[0],
@@ -412,51 +414,41 @@ def get_student_progress(student_id):
         'competency': row[5]
     } for row in results]
 
-def save_feedback(feedback_id, progress_id, teacher, student_id, feedback):
-    """Save teacher feedback"""
-    conn = sqlite3.connect(DB_NAME)
+def _write_feedback(conn, feedback_id, progress_id, teacher, student_id, feedback):
     cursor = conn.cursor()
     
     cursor.execute('''
         INSERT INTO feedback (feedback_id, progress_id, teacher, student_id, feedback)
         VALUES (?, ?, ?, ?, ?)
     ''', (feedback_id, progress_id, teacher, student_id, feedback))
-    
-    conn.commit()
-    conn.close()
 
+@instrument.helper
+def save_feedback(feedback_id, progress_id, teacher, student_id, feedback):
+    """Save teacher feedback; returns a future that resolves once committed"""
+    return db.submit_write(DB_NAME, _write_feedback, feedback_id, progress_id, teacher, student_id, feedback)
+
+@instrument.helper
 def get_feedback(progress_id):
     """Get feedback for a progress item"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT feedback, created_at FROM feedback 
-        WHERE progress_id = ?
-        ORDER BY created_at DESC
-    ''', (progress_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute(queries.FEEDBACK_SQL, (progress_id,))
+        results = cursor.fetchall()
     
     return [{
         'feedback': row[0],
         'date': row[1]
     } for row in results]
 
+@instrument.helper
 def get_completed_activities(student_id):
     """Get completed activities for feedback"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT p.progress_id, m.title, m.competency, p.completed_at
-        FROM progress p
-        JOIN materials m ON p.material_id = m.material_id
-        WHERE p.student_id = ? AND p.completed = 1
-        ORDER BY p.completed_at DESC
-    ''', (student_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute(queries.COMPLETED_ACTIVITIES_SQL, (student_id,))
+        results = cursor.fetchall()
     
     return [{
         'progress_id': row[0],
@@ -474,6 +466,107 @@ def create_download_link(file_data, filename):
     except Exception as e:
         return f"Error creating download link: {str(e)}"
 
+def render_material_download(material, key, mime):
+    """Download button that only reads the PDF from the database when it is clicked"""
+    material_id = material['material_id']
+    
+    def serve():
+        file_data = get_material_file(material_id) or b''
+        metrics.BLOB_BYTES.inc(len(file_data))
+        return file_data
+    
+    # Streamlit calls serve() once per download, so reruns never touch the BLOB
+    st.download_button(
+        label=f"📥 Download {material['filename']}",
+        data=serve,
+        file_name=material['filename'],
+        mime=mime,
+        key=key,
+        on_click="ignore"
+    )
+
+# Days of a material rendered with widgets at a time in the parent's day grid
+DAYS_PER_PAGE = 7
+
+def render_day_window(sid, material, progress_dict):
+    """Pick the week of days to render for a material and summarize the earlier ones"""
+    duration = material['duration_days']
+    completed_days = {day for day, dp in progress_dict.items() if dp['completed']}
+    st.progress(min(len(completed_days) / duration, 1.0), f"{len(completed_days)}/{duration} days completed")
+    
+    pages = (duration + DAYS_PER_PAGE - 1) // DAYS_PER_PAGE
+    if pages <= 1:
+        return range(1, duration + 1)
+    
+    def page_days(page):
+        return range(page * DAYS_PER_PAGE + 1, min((page + 1) * DAYS_PER_PAGE, duration) + 1)
+    
+    # Open on the week holding the first day that is not completed yet
+    first_open_day = next((day for day in range(1, duration + 1) if day not in completed_days), duration)
+    page = st.selectbox("Week", range(pages), index=(first_open_day - 1) // DAYS_PER_PAGE,
+                        format_func=lambda p: f"Week {p + 1} (Days {page_days(p)[0]}-{page_days(p)[-1]})",
+                        key=f"day_page_{sid}_{material['material_id']}")
+    
+    if page > 0:
+        with st.expander("Earlier days"):
+            for earlier in range(page):
+                days = page_days(earlier)
+                done = sum(1 for day in days if day in completed_days)
+                st.write(f"Week {earlier + 1} (Days {days[0]}-{days[-1]}): {done}/{len(days)} completed")
+    
+    return page_days(page)
+
+def get_competency_areas(student_grade):
+    """Get the competencies assessed and targeted for a grade"""
+    return load_competency_catalog().competencies(student_grade)
+
+def render_bulk_upload(teacher_students):
+    """Upload one PDF and assign it to several students of a grade at once"""
+    if st.session_state.get('bulk_upload_results'):
+        st.table(st.session_state.bulk_upload_results)
+        st.session_state.bulk_upload_results = None
+    
+    grades = sorted({get_student_info(sid)[1] for sid in teacher_students}, key=int)
+    grade = st.selectbox("Grade", grades, key="bulk_upload_grade")
+    grade_students = [sid for sid in teacher_students if get_student_info(sid)[1] == grade]
+    
+    with st.form("bulk_upload_form", clear_on_submit=True):
+        # Keyed per grade: a widget's default only applies the first time its key renders
+        selected_students = st.multiselect("Students", grade_students, default=grade_students,
+                                           format_func=lambda x: f"{get_student_info(x)[0]} ({x})",
+                                           key=f"bulk_students_{grade}")
+        target_competency = st.selectbox("Target Competency", get_competency_areas(grade),
+                                         key=f"bulk_target_comp_{grade}")
+        material_title = st.text_input("Material Title", key="bulk_mat_title")
+        material_description = st.text_area("Description", key="bulk_mat_desc")
+        duration_days = st.number_input("Duration (Number of Days)", min_value=1, max_value=30, value=5, key="bulk_duration")
+        uploaded_file = st.file_uploader("Upload PDF", type=['pdf'], key="bulk_pdf_upload")
+        
+        if st.form_submit_button("🚀 Assign to Selected Students"):
+            if not selected_students:
+                st.error("❌ Please select at least one student!")
+            elif not material_title:
+                st.error("❌ Please enter a material title!")
+            elif uploaded_file is None:
+                st.error("❌ Please select a PDF file to upload!")
+            elif validate_file_type(uploaded_file):
+                try:
+                    uploaded_file.seek(0)
+                    results = assign_material(selected_students, st.session_state.current_user,
+                                              target_competency, material_title, material_description,
+                                              uploaded_file, uploaded_file.name, duration_days)
+                    assigned = sum(1 for result in results if result['assigned'])
+                    
+                    st.session_state.upload_success = True
+                    st.session_state.upload_message = f"🎉 Material '{material_title}' assigned to {assigned} of {len(results)} students ({duration_days} days)!"
+                    st.session_state.bulk_upload_results = [{
+                        'Student': f"{get_student_info(result['student_id'])[0]} ({result['student_id']})",
+                        'Result': result['message']
+                    } for result in results]
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Error uploading file: {str(e)}")
+
 def validate_file_type(file):
     """Validate uploaded file type"""
     if file is not None:
@@ -485,38 +578,41 @@ def validate_file_type(file):
             return False
     return False
 
-def save_daily_progress(daily_progress_id, material_id, student_id, parent, day_number, completed=False, parent_comments=None):
-    """Save daily progress for a material"""
-    conn = sqlite3.connect(DB_NAME)
+def _write_daily_progress(conn, daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments, completed_at):
     cursor = conn.cursor()
     
     if completed:
         cursor.execute('''
             INSERT OR REPLACE INTO daily_progress (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments, completed_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments, datetime.now()))
+        ''', (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments, completed_at))
     else:
         cursor.execute('''
             INSERT OR REPLACE INTO daily_progress (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (daily_progress_id, material_id, student_id, parent, day_number, completed, parent_comments))
-    
-    conn.commit()
-    conn.close()
 
+@instrument.helper
+def save_daily_progress(daily_progress_id, material_id, student_id, parent, day_number, completed=False, parent_comments=None):
+    """Save daily progress for a material; returns a future that resolves once committed"""
+    def evict(result):
+        get_daily_progress.invalidate(material_id, student_id)
+        get_student_daily_progress_summary.invalidate(student_id)
+        get_student_daily_activity.invalidate(student_id)
+    
+    # Stamp completion now, not when a write-behind batch gets to it
+    return db.submit_write(DB_NAME, _write_daily_progress, daily_progress_id, material_id, student_id,
+                           parent, day_number, completed, parent_comments, datetime.now(), on_commit=evict)
+
+@instrument.helper
+@cached(ttl=DAILY_PROGRESS_TTL)
 def get_daily_progress(material_id, student_id):
     """Get daily progress for a material"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT daily_progress_id, day_number, completed, parent_comments, completed_at
-        FROM daily_progress 
-        WHERE material_id = ? AND student_id = ?
-        ORDER BY day_number
-    ''', (material_id, student_id))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute(queries.DAILY_PROGRESS_SQL, (material_id, student_id))
+        results = cursor.fetchall()
     
     return [{
         'daily_progress_id': row[0],
@@ -526,9 +622,7 @@ def get_daily_progress(material_id, student_id):
         'completed_at': row[4]
     } for row in results]
 
-def save_daily_feedback(daily_feedback_id, daily_progress_id, teacher, feedback):
-    """Save teacher feedback on daily progress"""
-    conn = sqlite3.connect(DB_NAME)
+def _write_daily_feedback(conn, daily_feedback_id, daily_progress_id, teacher, feedback):
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -536,42 +630,46 @@ def save_daily_feedback(daily_feedback_id, daily_progress_id, teacher, feedback)
         VALUES (?, ?, ?, ?)
     ''', (daily_feedback_id, daily_progress_id, teacher, feedback))
     
-    conn.commit()
-    conn.close()
+    # The student whose activity view now needs evicting
+    cursor.execute(queries.DAILY_PROGRESS_STUDENT_SQL, (daily_progress_id,))
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+@instrument.helper
+def save_daily_feedback(daily_feedback_id, daily_progress_id, teacher, feedback):
+    """Save teacher feedback on daily progress; returns a future that resolves once committed"""
+    def evict(student_id):
+        get_daily_feedback.invalidate(daily_progress_id)
+        if student_id:
+            get_student_daily_activity.invalidate(student_id)
+    
+    return db.submit_write(DB_NAME, _write_daily_feedback, daily_feedback_id, daily_progress_id, teacher, feedback,
+                           on_commit=evict)
 
+@instrument.helper
+@cached(ttl=DAILY_PROGRESS_TTL)
 def get_daily_feedback(daily_progress_id):
     """Get teacher feedback for daily progress"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT feedback, created_at FROM daily_feedback 
-        WHERE daily_progress_id = ?
-        ORDER BY created_at DESC
-    ''', (daily_progress_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute(queries.DAILY_FEEDBACK_SQL, (daily_progress_id,))
+        results = cursor.fetchall()
     
     return [{
         'feedback': row[0],
         'date': row[1]
     } for row in results]
 
+@instrument.helper
+@cached(ttl=DAILY_PROGRESS_TTL)
 def get_student_daily_progress_summary(student_id):
     """Get summary of daily progress for teacher review"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT dp.daily_progress_id, dp.material_id, dp.day_number, dp.completed, 
-               dp.parent_comments, dp.completed_at, m.title, m.competency
-        FROM daily_progress dp
-        JOIN materials m ON dp.material_id = m.material_id
-        WHERE dp.student_id = ?
-        ORDER BY m.uploaded_at DESC, dp.day_number
-    ''', (student_id,))
-    results = cursor.fetchall()
-    conn.close()
+        cursor.execute(queries.STUDENT_DAILY_PROGRESS_SUMMARY_SQL, (student_id,))
+        results = cursor.fetchall()
     
     return [{
         'daily_progress_id': row[0],
@@ -584,6 +682,88 @@ def get_student_daily_progress_summary(student_id):
         'competency': row[7]
     } for row in results]
 
+def competency_status(days_completed, days_assigned):
+    """Summarize completed days against assigned days"""
+    if days_assigned and days_completed >= days_assigned:
+        return "✅ Completed"
+    if days_completed:
+        return "⏳ In Progress"
+    return "Not started"
+
+@instrument.helper
+def get_class_overview(teacher):
+    """Get per-student, per-competency completion for a teacher's class in one GROUP BY query"""
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.CLASS_OVERVIEW_SQL, (teacher, teacher))
+        results = cursor.fetchall()
+    
+    overview = {}
+    for row in results:
+        student = overview.get(row[0])
+        if student is None:
+            student = overview[row[0]] = {
+                'student_id': row[0],
+                'name': row[1],
+                'grade': row[2],
+                'materials': 0,
+                'days_assigned': 0,
+                'days_completed': 0,
+                'last_activity': None,
+                'competencies': []
+            }
+        if row[3] is None:
+            continue  # no materials assigned yet
+        student['materials'] += row[4]
+        student['days_assigned'] += row[5]
+        student['days_completed'] += row[6]
+        if row[7] and (student['last_activity'] is None or row[7] > student['last_activity']):
+            student['last_activity'] = row[7]
+        student['competencies'].append({
+            'competency': row[3],
+            'materials': row[4],
+            'days_assigned': row[5],
+            'days_completed': row[6],
+            'status': competency_status(row[6], row[5]),
+            'last_activity': row[7]
+        })
+    
+    return list(overview.values())
+
+@instrument.helper
+@cached(ttl=DAILY_PROGRESS_TTL)
+def get_student_daily_activity(student_id):
+    """Get a student's daily progress with teacher feedback in one query, grouped by material"""
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.STUDENT_DAILY_ACTIVITY_SQL, (student_id,))
+        results = cursor.fetchall()
+    
+    # material_id -> day rows in day order, each carrying its feedback list
+    activity = {}
+    days = {}
+    for row in results:
+        day = days.get(row[0])
+        if day is None:
+            day = days[row[0]] = {
+                'daily_progress_id': row[0],
+                'material_id': row[1],
+                'day_number': row[2],
+                'completed': row[3],
+                'parent_comments': row[4],
+                'completed_at': row[5],
+                'title': row[6],
+                'competency': row[7],
+                'feedback': []
+            }
+            activity.setdefault(row[1], []).append(day)
+        if row[8] is not None:
+            day['feedback'].append({'feedback': row[8], 'date': row[9]})
+    
+    return activity
+
 # Add mobile detection and fallback
 def is_mobile():
     """Detect if user is on mobile device"""
@@ -607,57 +787,90 @@ def safe_markdown(text):
     return text
 
 # Add these new functions for session management
+@instrument.helper
 def create_session(username, user_type, days=7):
     """Create a persistent session"""
     session_id = str(uuid.uuid4())
     expires_at = datetime.now() + timedelta(days=days)
     
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    # Clean up old sessions first
-    cursor.execute('DELETE FROM sessions WHERE expires_at < ?', (datetime.now(),))
-    
-    # Create new session
-    cursor.execute('''
-        INSERT INTO sessions (session_id, username, user_type, expires_at)
-        VALUES (?, ?, ?, ?)
-    ''', (session_id, username, user_type, expires_at))
+        # Expired rows are purged by the background sweeper, not on login
+        cursor.execute('''
+            INSERT INTO sessions (session_id, username, user_type, expires_at)
+            VALUES (?, ?, ?, ?)
+        ''', (session_id, username, user_type, expires_at))
     
-    conn.commit()
-    conn.close()
     
     return session_id
 
+@instrument.helper
 def validate_session(session_id):
     """Validate and return session info"""
     if not session_id:
         return None
     
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    cache = get_cache()
+    key = ('validate_session', session_id)
+    hit, info = cache.get(key)
+    if hit:
+        metrics.SESSIONS_VALIDATED.inc(result='cached')
+        return info
+    token = cache.token()
     
-    cursor.execute('''
-        SELECT username, user_type FROM sessions 
-        WHERE session_id = ? AND expires_at > ?
-    ''', (session_id, datetime.now()))
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    result = cursor.fetchone()
-    conn.close()
+        cursor.execute(queries.VALIDATE_SESSION_SQL, (session_id, datetime.now()))
+    
+        result = cursor.fetchone()
     
     if result:
-        return {'username': result[0], 'user_type': result[1]}
+        info = {'username': result[0], 'user_type': result[1]}
+        # Never serve a session from the cache past its own expiry
+        remaining = (datetime.fromisoformat(result[2]) - datetime.now()).total_seconds()
+        cache.set(key, info, min(SESSION_CACHE_TTL, remaining), token)
+        metrics.SESSIONS_VALIDATED.inc(result='valid')
+        return info
+    metrics.SESSIONS_VALIDATED.inc(result='invalid')
     return None
 
+@instrument.helper
 def delete_session(session_id):
     """Delete a session (logout)"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        cursor.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
     
-    conn.commit()
-    conn.close()
+    get_cache().invalidate(('validate_session', session_id))
+
+@instrument.helper
+def sweep_expired_sessions():
+    """Delete expired sessions and return how many were removed"""
+    with db.get_connection(DB_NAME) as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute(queries.DELETE_EXPIRED_SESSIONS_SQL, (datetime.now(),))
+        return cursor.rowcount
+
+@st.cache_resource
+def start_session_sweeper():
+    """Purge expired sessions on a background thread (started once per process)"""
+    stop = threading.Event()
+    
+    def run():
+        while True:
+            try:
+                sweep_expired_sessions()
+            except sqlite3.Error:
+                pass  # e.g. database busy; the next pass retries
+            if stop.wait(SESSION_SWEEP_INTERVAL):
+                return
+    
+    threading.Thread(target=run, name='session-sweeper', daemon=True).start()
+    return stop
 
 # Modified session initialization
 def init_session():
@@ -699,12 +912,72 @@ def logout_user():
     # Clear URL parameters
     st.query_params.clear()
 
+@instrument.helper
 def backup_database():
     """Create database backup"""
     if os.path.exists(DB_NAME):
         backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        import shutil
-        shutil.copy2(DB_NAME, backup_name)
+        # Use the backup API rather than copying the file: in WAL mode recent
+        # commits may still live in the -wal file next to the database
+        backup_conn = sqlite3.connect(backup_name)
+        with db.get_connection(DB_NAME) as conn:
+            conn.backup(backup_conn)
+        backup_conn.close()
+
+def is_admin():
+    """Check whether the logged in user may see diagnostics"""
+    return st.session_state.get('logged_in') and st.session_state.get('current_user') in ADMIN_USERS
+
+def render_diagnostics():
+    """Show database diagnostics in the sidebar (admins only)"""
+    with st.expander("🛠️ Diagnostics"):
+        st.write("**Database settings**")
+        st.caption(DB_NAME)
+        st.table(db.pragma_report(DB_NAME))
+        
+        read_cache = get_cache()
+        st.write("**Read cache**")
+        st.write(f"{len(read_cache)} entries, {read_cache.hits} hits, {read_cache.misses} misses")
+        
+        render_profiles()
+        
+        st.write("**Data helpers**")
+        if not instrument.ENABLED:
+            st.caption("Set REMEDIAL_INSTRUMENT=1 to time helpers and log slow queries.")
+            return
+        
+        last_rerun = st.session_state.get('last_rerun_stats')
+        if last_rerun:
+            st.caption(f"Previous rerun: {last_rerun['queries']} queries, {last_rerun['query_ms']} ms in SQL")
+            st.dataframe(last_rerun['helpers'], hide_index=True)
+        st.caption("Since the server started")
+        st.dataframe(instrument.helper_totals(), hide_index=True)
+        
+        st.write(f"**Slow queries** (over {instrument.SLOW_QUERY_MS:g} ms)")
+        if instrument.slow_queries:
+            st.dataframe(list(reversed(instrument.slow_queries)), hide_index=True)
+        else:
+            st.caption("None so far.")
+
+def render_profiles():
+    """Recent rerun profiles per role, downloadable as pstats or collapsed stacks"""
+    st.write("**Rerun profiles**")
+    profiles = profiling.recent_profiles()
+    if not profiles:
+        st.caption(f"Set REMEDIAL_PROFILE=1 or add ?{profiling.QUERY_PARAM}=1 to the URL to profile reruns.")
+        return
+    
+    role = st.selectbox("Role", sorted(profiles), key="profile_role")
+    profile = st.selectbox("Rerun", profiles[role], key="profile_rerun",
+                           format_func=lambda p: f"{p['started_at']} ({p['wall_ms']} ms, {p['samples']} samples)")
+    stamp = profile['started_at'].replace(':', '')
+    if profile['pstats']:
+        st.download_button("Download .pstats", profile['pstats'],
+                           file_name=f"rerun_{role}_{stamp}.pstats", mime='application/octet-stream',
+                           key="profile_pstats")
+    st.download_button("Download collapsed stacks", profile['collapsed'],
+                       file_name=f"rerun_{role}_{stamp}.collapsed.txt", mime='text/plain',
+                       key="profile_collapsed")
 
 def safe_db_operation(operation):
     """Safely execute database operations"""
@@ -714,13 +987,24 @@ def safe_db_operation(operation):
         st.error(f"Database error: {str(e)}")
         return None
 
-# Initialize database
+# Initialize database; reruns hit the resource cache instead of running DDL
 init_database()
+start_session_sweeper()
+
+@st.cache_resource
+def start_metrics_exporter():
+    """Publish metrics over HTTP and/or to a file, if configured (once per process)"""
+    return metrics.start_exporter()
+
+start_metrics_exporter()
 
 # Main application
 def main():
     st.title("📚 D. P. Public School's Remedial Sessions Platform")
     
+    # Student and user lookups are memoized per rerun only
+    reset_request_cache()
+    
     # Initialize persistent session
     init_session()
     
@@ -735,6 +1019,9 @@ def main():
             if st.button("Logout"):
                 logout_user()
                 st.rerun()
+            
+            if is_admin():
+                render_diagnostics()
         else:
             st.write("Please login to continue")
     
@@ -804,7 +1091,7 @@ def teacher_dashboard():
         
         with col1:
             student_name = st.text_input("Student Name")
-            student_grade = st.selectbox("Grade", ["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12"])
+            student_grade = st.selectbox("Grade", load_competency_catalog().grades)
             student_id = st.text_input("Student ID")
         
         with col2:
@@ -847,38 +1134,7 @@ def teacher_dashboard():
                 student_info = get_student_info(selected_student)
                 student_grade = student_info[1]  # Get the grade
     
-                # Define grade-specific competencies
-                if student_grade == "1":
-                    competency_areas = [
-                        # English
-                        "English - Listening & Auditory - Sound discrimination",
-                        "English - Speaking & Oral - Clear articulation", 
-                        "English - Visual Literacy - Letter recognition (a-z, A-Z)",
-                        "English - Pre-Reading/Reading - Phonemic blending",
-                        "English - Pre-Writing - Pencil grip/control",
-                        "English - Pre-Writing - Letter formation",
-                        # Math
-                        "Math - Numeracy Readiness - Number recognition (1-20)",
-                        "Math - Numeracy Readiness - Counting objects accurately",
-                        "Math - Spatial/Shape Awareness - Shape recognition", 
-                        "Math - Measurement Concepts - Size & quantity comparison",
-                        # Hindi
-                        "Hindi - Listening - Recognize Hindi sounds (स्वर, व्यंजन)",
-                        "Hindi - Speaking - Clear pronunciation",
-                        "Hindi - Speaking - Simple sentence formation",
-                        "Hindi - Speaking - Poem recitation",
-                        "Hindi - Reading - Letter/matra recognition",
-                        "Hindi - Reading - Reading small words",
-                        "Hindi - Writing - Letter formation",
-                        "Hindi - Writing - Copy simple words"
-                    ]
-                else:
-                    # Keep existing competencies for other grades
-                    competency_areas = [
-                        "Reading Comprehension", "Mathematical Problem Solving", "Scientific Inquiry",
-                        "Writing Skills", "Critical Thinking", "Communication", "Creativity",
-                        "Time Management", "Research Skills", "Digital Literacy"
-                    ]
+                competency_areas = get_competency_areas(student_grade)
                 
                 st.subheader("Competency Assessment")
                 competency_scores = {}
@@ -914,46 +1170,22 @@ def teacher_dashboard():
                 st.session_state.upload_success = False
                 st.session_state.upload_message = ""
             
-            selected_student = st.selectbox("Select Student", teacher_students, 
-                          format_func=lambda x: f"{get_student_info(x)[0]} ({x})",
-                          key="upload_materials_student")
+            assign_mode = st.radio("Assign material to", ["One student", "Several students"],
+                                   horizontal=True, key="upload_assign_mode")
+            
+            if assign_mode == "Several students":
+                render_bulk_upload(teacher_students)
+                selected_student = None
+            else:
+                selected_student = st.selectbox("Select Student", teacher_students, 
+                              format_func=lambda x: f"{get_student_info(x)[0]} ({x})",
+                              key="upload_materials_student")
             
             if selected_student:
                 student_info = get_student_info(selected_student)
                 student_grade = student_info[1]  # Get the grade
                 
-                # Define grade-specific competencies
-                if student_grade == "1":
-                    competency_areas = [
-                        # English
-                        "English - Listening & Auditory - Sound discrimination",
-                        "English - Speaking & Oral - Clear articulation", 
-                        "English - Visual Literacy - Letter recognition (a-z, A-Z)",
-                        "English - Pre-Reading/Reading - Phonemic blending",
-                        "English - Pre-Writing - Pencil grip/control",
-                        "English - Pre-Writing - Letter formation",
-                        # Math
-                        "Math - Numeracy Readiness - Number recognition (1-20)",
-                        "Math - Numeracy Readiness - Counting objects accurately",
-                        "Math - Spatial/Shape Awareness - Shape recognition", 
-                        "Math - Measurement Concepts - Size & quantity comparison",
-                        # Hindi
-                        "Hindi - Listening - Recognize Hindi sounds (स्वर, व्यंजन)",
-                        "Hindi - Speaking - Clear pronunciation",
-                        "Hindi - Speaking - Simple sentence formation",
-                        "Hindi - Speaking - Poem recitation",
-                        "Hindi - Reading - Letter/matra recognition",
-                        "Hindi - Reading - Reading small words",
-                        "Hindi - Writing - Letter formation",
-                        "Hindi - Writing - Copy simple words"
-                    ]
-                else:
-                    # Keep existing competencies for other grades
-                    competency_areas = [
-                        "Reading Comprehension", "Mathematical Problem Solving", "Scientific Inquiry",
-                        "Writing Skills", "Critical Thinking", "Communication", "Creativity",
-                        "Time Management", "Research Skills", "Digital Literacy"
-                    ]
+                competency_areas = get_competency_areas(student_grade)
                 
                 st.info(f"📚 Uploading material for: **{get_student_info(selected_student)[0]}** (Grade {student_grade})")
                 
@@ -994,11 +1226,11 @@ def teacher_dashboard():
                                 progress_bar.progress(50)
                                 status_text.text("💾 Saving to database...")
                                 
-                                # Save to database
-                                file_data = uploaded_file.getvalue()
+                                # Save to database, streaming the upload in chunks
+                                uploaded_file.seek(0)
                                 save_material(material_id, selected_student, st.session_state.current_user, 
                                             target_competency, material_title, material_description, 
-                                            file_data, uploaded_file.name, duration_days)
+                                            uploaded_file, uploaded_file.name, duration_days)
                                 
                                 progress_bar.progress(100)
                                 status_text.text("✅ Upload completed successfully!")
@@ -1032,13 +1264,9 @@ def teacher_dashboard():
                             st.write(f"**Uploaded:** {material['uploaded_at']}")
                             
                             # Download button for existing materials
-                            st.download_button(
-                                label=f"📥 Download {material['filename']}",
-                                data=material['file_data'],
-                                file_name=material['filename'],
-                                mime='application/pdf',
-                                key=f"teacher_download_{selected_student}_{material['material_id']}"
-                            )
+                            render_material_download(material, 
+                                                     key=f"teacher_download_{selected_student}_{material['material_id']}",
+                                                     mime='application/pdf')
                 else:
                     st.info("No materials uploaded yet for this student.")
         else:
@@ -1049,24 +1277,80 @@ def teacher_dashboard():
         teacher_students = get_user_students(st.session_state.current_user, 'teacher')
         
         if teacher_students:
-            for sid in teacher_students:
-                student_info = get_student_info(sid)
-                if student_info:
-                    st.write(f"**{student_info[0]}** (ID: {sid})")
-                    
-                    # Show progress for this student
-                    progress_data = get_student_progress(sid)
-                    
-                    if progress_data:
-                        for prog in progress_data:
-                            status = "✅ Completed" if prog['completed'] else "⏳ In Progress"
-                            st.write(f"- {prog['competency']}: {prog['title']} - {status}")
-                            if prog['completed'] and prog['completed_at']:
-                                st.write(f"  Completed on: {prog['completed_at']}")
-                    else:
-                        st.write("No progress recorded yet.")
+            # Whole class in one aggregated query
+            overview = get_class_overview(st.session_state.current_user)
+            
+            st.dataframe([{
+                'Student': f"{student['name']} ({student['student_id']})",
+                'Grade': student['grade'],
+                'Materials': student['materials'],
+                'Days Completed': f"{student['days_completed']}/{student['days_assigned']}",
+                'Completion %': round(100 * student['days_completed'] / student['days_assigned']) if student['days_assigned'] else 0,
+                'Last Activity': student['last_activity'] or "-"
+            } for student in overview], hide_index=True, width="stretch")
+            
+            # Whole-class statistics over each student's latest two assessments
+            class_stats = analytics.class_competency_analytics(DB_NAME, st.session_state.current_user)
+            if class_stats['competencies']:
+                st.write("**Competency scores (latest assessments, weakest first):**")
+                st.dataframe([{
+                    'Competency': comp['competency'],
+                    'Assessed': comp['assessed'],
+                    'Average': round(comp['mean'], 1),
+                    'Median': comp['percentiles'][50],
+                    '25th-75th pct': f"{comp['percentiles'][25]:.0f}-{comp['percentiles'][75]:.0f}",
+                    f'Below {analytics.BELOW_THRESHOLD}': comp['below_threshold'],
+                    'Avg change': "-" if math.isnan(comp['mean_delta']) else f"{comp['mean_delta']:+.1f}",
+                    'Improved / declined': f"{comp['improved']} / {comp['declined']}"
+                } for comp in class_stats['competencies']], hide_index=True, width="stretch")
+            
+            # Drill down into one student at a time
+            students_by_id = {student['student_id']: student for student in overview}
+            selected_student = st.selectbox("Student details", list(students_by_id),
+                                            format_func=lambda x: f"{students_by_id[x]['name']} ({x})",
+                                            key="track_progress_student")
+            
+            if selected_student:
+                student = students_by_id[selected_student]
+                if student['competencies']:
+                    st.dataframe([{
+                        'Competency': comp['competency'],
+                        'Materials': comp['materials'],
+                        'Days Completed': f"{comp['days_completed']}/{comp['days_assigned']}",
+                        'Status': comp['status'],
+                        'Last Activity': comp['last_activity'] or "-"
+                    } for comp in student['competencies']], hide_index=True, width="stretch")
+                else:
+                    st.write("No materials assigned yet.")
+                
+                # Did the remedial work move the scores?
+                history = get_assessment_history(selected_student)
+                if history:
+                    st.write("**Assessment history:**")
+                    st.dataframe([{
+                        'Competency': competency,
+                        'Assessments': len(series['scores']),
+                        'First': series['scores'][0],
+                        'Latest': series['scores'][-1],
+                        'Last change': "-" if series['last_change'] is None else f"{series['last_change']:+.0f}",
+                        'Trend (pts/week)': "-" if series['slope'] is None else f"{series['slope']:+.1f}"
+                    } for competency, series in history.items()], hide_index=True, width="stretch")
                     
-                    st.divider()
+                    if any(len(series['scores']) > 1 for series in history.values()):
+                        chart = {}
+                        for competency, series in history.items():
+                            for date, score in zip(series['dates'], series['scores']):
+                                chart.setdefault(date, {'Date': date})[competency] = score
+                        st.line_chart(list(chart.values()), x='Date')
+                
+                # Materials marked complete as a whole
+                progress_data = get_student_progress(selected_student)
+                if progress_data:
+                    for prog in progress_data:
+                        status = "✅ Completed" if prog['completed'] else "⏳ In Progress"
+                        st.write(f"- {prog['competency']}: {prog['title']} - {status}")
+                        if prog['completed'] and prog['completed_at']:
+                            st.write(f"  Completed on: {prog['completed_at']}")
         else:
             st.info("No students to track.")
     
@@ -1079,54 +1363,141 @@ def teacher_dashboard():
                                       format_func=lambda x: f"{get_student_info(x)[0]} ({x})",
                                       key="daily_feedback_student")
     
-            daily_progress_data = get_student_daily_progress_summary(selected_student)
+            # Days grouped by material, with feedback attached, from a single query
+            materials_progress = get_student_daily_activity(selected_student)
     
-            if daily_progress_data:
-                # Group by material
-                from collections import defaultdict
-                materials_progress = defaultdict(list)
-        
-                for progress in daily_progress_data:
-                    materials_progress[progress['material_id']].append(progress)
-        
-                for material_id, progress_list in materials_progress.items():
-                    st.write(f"**{progress_list[0]['title']}** - {progress_list[0]['competency']}")
-            
-                    for progress in progress_list:
-                        status = "✅ Completed" if progress['completed'] else "⏳ Pending"
-                        st.write(f"Day {progress['day_number']}: {status}")
-                
-                        if progress['completed_at']:
-                            st.write(f"  Completed on: {progress['completed_at']}")
-                
-                        if progress['parent_comments']:
-                            st.write(f"  **Parent Comment:** {progress['parent_comments']}")
-                
-                        # Show existing feedback
-                        existing_feedback = get_daily_feedback(progress['daily_progress_id'])
-                        if existing_feedback:
-                            for fb in existing_feedback:
-                                st.write(f"  **Your Feedback:** {fb['feedback']} ({fb['date']})")
-                
-                        # Provide feedback
-                        feedback_key = f"feedback_{progress['daily_progress_id']}"
-                        new_feedback = st.text_input(f"Add feedback for Day {progress['day_number']}", key=feedback_key)
-                
-                        if st.button(f"Submit Feedback Day {progress['day_number']}", key=f"submit_{progress['daily_progress_id']}_{progress['day_number']}"):
-                            if new_feedback:
-                                feedback_id = f"{progress['daily_progress_id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                                save_daily_feedback(feedback_id, progress['daily_progress_id'], 
-                                                st.session_state.current_user, new_feedback)
-                                st.success("Feedback submitted!")
-                                st.rerun()
-                
-                        st.write("---")
-                    st.divider()
+            if materials_progress:
+                for material_id in materials_progress:
+                    render_daily_feedback(selected_student, material_id)
             else:
                 st.info("No daily progress data available.")
         else:
             st.info("No students available.")
 
+def rerun_fragment():
+    """Rerun just the calling fragment, or the whole app if this is a full run"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # A click can be folded into a full rerun, where fragment scope is not allowed
+        st.rerun()
+
+@st.fragment
+def render_daily_feedback(student_id, material_id):
+    """One material's days and feedback inputs; reruns on its own when feedback is submitted"""
+    # Cached per student, so sibling panels share one query
+    progress_list = get_student_daily_activity(student_id).get(material_id)
+    if not progress_list:
+        return
+    
+    st.write(f"**{progress_list[0]['title']}** - {progress_list[0]['competency']}")
+
+    for progress in progress_list:
+        status = "✅ Completed" if progress['completed'] else "⏳ Pending"
+        st.write(f"Day {progress['day_number']}: {status}")
+
+        if progress['completed_at']:
+            st.write(f"  Completed on: {progress['completed_at']}")
+
+        if progress['parent_comments']:
+            st.write(f"  **Parent Comment:** {progress['parent_comments']}")
+
+        # Show existing feedback
+        for fb in progress['feedback']:
+            st.write(f"  **Your Feedback:** {fb['feedback']} ({fb['date']})")
+
+        # Provide feedback
+        feedback_key = f"feedback_{progress['daily_progress_id']}"
+        new_feedback = st.text_input(f"Add feedback for Day {progress['day_number']}", key=feedback_key)
+
+        if st.button(f"Submit Feedback Day {progress['day_number']}", key=f"submit_{progress['daily_progress_id']}_{progress['day_number']}"):
+            if new_feedback:
+                feedback_id = f"{progress['daily_progress_id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                # Wait for the commit, so the rerun below shows the new feedback
+                save_daily_feedback(feedback_id, progress['daily_progress_id'], 
+                                st.session_state.current_user, new_feedback).result()
+                st.success("Feedback submitted!")
+                rerun_fragment()
+
+        st.write("---")
+    st.divider()
+
+@st.fragment
+def render_material_progress(sid, material_idx, material):
+    """One material's download and day grid; reruns on its own when a day is saved"""
+    st.write(f"**{material['title']}** - {material['competency']}")
+    st.write(f"Description: {material['description']}")
+    st.write(f"Duration: {material['duration_days']} days")
+
+    # Download link with unique key
+    render_material_download(material, 
+                             key=f"download_{sid}_{material_idx}_{material['material_id']}",
+                             mime='application/octet-stream')
+
+    # Daily progress tracking
+    st.write("**Daily Progress:**")
+
+    # Cached per student, so sibling panels share one query
+    activity = get_student_daily_activity(sid)
+    daily_progress = activity.get(material['material_id'], [])
+    progress_dict = {dp['day_number']: dp for dp in daily_progress}
+
+    # Widgets only for one week of days, however long the material runs
+    for day in render_day_window(sid, material, progress_dict):
+        col1, col2, col3 = st.columns([1, 3, 1])
+    
+        with col1:
+            st.write(f"Day {day}")
+    
+        with col2:
+            # Check if this day already has progress
+            existing_progress = progress_dict.get(day)
+        
+            if existing_progress:
+                if existing_progress['completed']:
+                    st.success(f"✅ Completed on {existing_progress['completed_at']}")
+                    if existing_progress['parent_comments']:
+                        st.write(f"Your comment: {existing_progress['parent_comments']}")
+                
+                    # Show teacher feedback
+                    for fb in existing_progress['feedback']:
+                        st.info(f"Teacher feedback: {fb['feedback']}")
+                else:
+                    st.warning("⏳ In Progress")
+                    if existing_progress['parent_comments']:
+                        st.write(f"Your comment: {existing_progress['parent_comments']}")
+            else:
+                st.write("Not started")
+        
+            # Comments input with unique key
+            comment_key = f"comment_{sid}_{material['material_id']}_day_{day}"
+            existing_comment = existing_progress['parent_comments'] if existing_progress else ""
+            parent_comment = st.text_input(f"Add comment for Day {day}", 
+                                     value=existing_comment, 
+                                     key=comment_key)
+    
+        with col3:
+            if not existing_progress or not existing_progress['completed']:
+                if st.button(f"Mark Complete", key=f"mark_complete_{sid}_{material['material_id']}_day_{day}"):
+                    daily_progress_id = f"{material['material_id']}_day_{day}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                    save_daily_progress(daily_progress_id, material['material_id'], sid, 
+                          st.session_state.current_user, day, 
+                          completed=True, parent_comments=parent_comment).result()
+                    st.success(f"Day {day} marked as completed!")
+                    rerun_fragment()
+
+            # Save comment button (for when not marking as complete)
+            if st.button(f"Save Comment", key=f"save_comment_only_{sid}_{material['material_id']}_day_{day}"):
+                if parent_comment:
+                    daily_progress_id = f"{material['material_id']}_day_{day}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                    save_daily_progress(daily_progress_id, material['material_id'], sid, 
+                          st.session_state.current_user, day, 
+                          completed=False, parent_comments=parent_comment).result()
+                    st.success("Comment saved!")
+                    rerun_fragment()
+
+    st.divider()
+
 # Replace the parent_dashboard function with this fixed version:
 
 def parent_dashboard():
@@ -1198,81 +1569,7 @@ def parent_dashboard():
                 
                     if materials:
                         for material_idx, material in enumerate(materials):
-                            st.write(f"**{material['title']}** - {material['competency']}")
-                            st.write(f"Description: {material['description']}")
-                            st.write(f"Duration: {material['duration_days']} days")
-                        
-                            # Download link with unique key
-                            st.download_button(
-                                label=f"📥 Download {material['filename']}",
-                                data=material['file_data'],
-                                file_name=material['filename'],
-                                mime='application/octet-stream',
-                                key=f"download_{sid}_{material_idx}_{material['material_id']}"
-                            )
-                        
-                            # Daily progress tracking
-                            st.write("**Daily Progress:**")
-                        
-                            daily_progress = get_daily_progress(material['material_id'], sid)
-                            progress_dict = {dp['day_number']: dp for dp in daily_progress}
-                        
-                            for day in range(1, material['duration_days'] + 1):
-                                col1, col2, col3 = st.columns([1, 3, 1])
-                            
-                                with col1:
-                                    st.write(f"Day {day}")
-                            
-                                with col2:
-                                    # Check if this day already has progress
-                                    existing_progress = progress_dict.get(day)
-                                
-                                    if existing_progress:
-                                        if existing_progress['completed']:
-                                            st.success(f"✅ Completed on {existing_progress['completed_at']}")
-                                            if existing_progress['parent_comments']:
-                                                st.write(f"Your comment: {existing_progress['parent_comments']}")
-                                        
-                                            # Show teacher feedback
-                                            daily_feedback = get_daily_feedback(existing_progress['daily_progress_id'])
-                                            if daily_feedback:
-                                                for fb in daily_feedback:
-                                                    st.info(f"Teacher feedback: {fb['feedback']}")
-                                        else:
-                                            st.warning("⏳ In Progress")
-                                            if existing_progress['parent_comments']:
-                                                st.write(f"Your comment: {existing_progress['parent_comments']}")
-                                    else:
-                                        st.write("Not started")
-                                
-                                    # Comments input with unique key
-                                    comment_key = f"comment_{sid}_{material['material_id']}_day_{day}"
-                                    existing_comment = existing_progress['parent_comments'] if existing_progress else ""
-                                    parent_comment = st.text_input(f"Add comment for Day {day}", 
-                                                             value=existing_comment, 
-                                                             key=comment_key)
-                            
-                                with col3:
-                                    if not existing_progress or not existing_progress['completed']:
-                                        if st.button(f"Mark Complete", key=f"mark_complete_{sid}_{material['material_id']}_day_{day}"):
-                                            daily_progress_id = f"{material['material_id']}_day_{day}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                                            save_daily_progress(daily_progress_id, material['material_id'], sid, 
-                                                  st.session_state.current_user, day, 
-                                                  completed=True, parent_comments=parent_comment)
-                                            st.success(f"Day {day} marked as completed!")
-                                            st.rerun()
-
-                                    # Save comment button (for when not marking as complete)
-                                    if st.button(f"Save Comment", key=f"save_comment_only_{sid}_{material['material_id']}_day_{day}"):
-                                        if parent_comment:
-                                            daily_progress_id = f"{material['material_id']}_day_{day}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                                            save_daily_progress(daily_progress_id, material['material_id'], sid, 
-                                                  st.session_state.current_user, day, 
-                                                  completed=False, parent_comments=parent_comment)
-                                            st.success("Comment saved!")
-                                            st.rerun()
-                        
-                            st.divider()
+                            render_material_progress(sid, material_idx, material)
                     else:
                         st.write("No materials available yet.")
                 
@@ -1282,4 +1579,17 @@ def parent_dashboard():
     
 
 if __name__ == "__main__":
-    main()
+    profile = profiling.start() if profiling.requested(st.query_params) else None
+    instrument.begin_rerun()
+    rerun_started = time.perf_counter()
+    try:
+        main()
+    finally:
+        # Tabs don't report which one is open, so reruns are counted per dashboard
+        view = st.session_state.get('user_type') or 'login'
+        metrics.RERUNS.inc(view=view)
+        metrics.RERUN_SECONDS.observe(time.perf_counter() - rerun_started, view=view)
+        # Shown in the diagnostics panel on the next rerun
+        st.session_state.last_rerun_stats = instrument.end_rerun()
+        if profile:
+            profile.finish(st.session_state.get('user_type') or 'anonymous')
@@ -0,0 +1,190 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import seed
+
+# Times every data helper in app5.py against seeded databases of increasing
+# size and reports p50/p99 latency per helper as JSON. Caches are cleared
+# before each call, so the numbers are for the SQL path, not cache hits.
+#
+#   python benchmarks/query_bench.py --sizes 10,50,200 --output results.json
+#   python benchmarks/query_bench.py --compare results.json   # exit 1 on regression
+
+SAMPLES = 20  # distinct arguments drawn per helper
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def sample_arguments(db_path, seed_value):
+    """Pick teachers, parents, students, materials and days to call the helpers with"""
+    rng = random.Random(seed_value)
+
+    def pick(rows):
+        return rng.sample(rows, min(SAMPLES, len(rows)))
+
+    with db.get_connection(db_path) as conn:
+        def column(sql):
+            return pick([row[0] for row in conn.execute(sql)])
+
+        return {
+            'teachers': column("SELECT username FROM users WHERE user_type = 'teacher' ORDER BY username"),
+            'parents': column("SELECT username FROM users WHERE user_type = 'parent' ORDER BY username"),
+            'students': column('SELECT student_id FROM students ORDER BY student_id'),
+            'materials': pick(conn.execute(
+                'SELECT material_id, student_id FROM materials ORDER BY material_id').fetchall()),
+            'days': column('SELECT daily_progress_id FROM daily_progress ORDER BY daily_progress_id'),
+        }
+
+
+def helper_cases(app5, analytics, samples, session_ids):
+    """(helper name, function, list of argument tuples) for every timed helper"""
+    teachers = [(t,) for t in samples['teachers']]
+    students = [(s,) for s in samples['students']]
+    return [
+        ('get_user_students[teacher]', app5.get_user_students, [(t, 'teacher') for t in samples['teachers']]),
+        ('get_user_students[parent]', app5.get_user_students, [(p, 'parent') for p in samples['parents']]),
+        ('get_class_overview', app5.get_class_overview, teachers),
+        ('class_competency_analytics', analytics.class_competency_analytics,
+         [(app5.DB_NAME, t) for t in samples['teachers']]),
+        ('get_student_info', app5.get_student_info, students),
+        ('get_latest_assessment', app5.get_latest_assessment, students),
+        ('get_assessment_history', app5.get_assessment_history, students),
+        ('get_student_materials', app5.get_student_materials, students),
+        ('get_material_file', app5.get_material_file, [(m,) for m, s in samples['materials']]),
+        ('get_student_progress', app5.get_student_progress, students),
+        ('get_completed_activities', app5.get_completed_activities, students),
+        ('get_daily_progress', app5.get_daily_progress, samples['materials']),
+        ('get_daily_feedback', app5.get_daily_feedback, [(d,) for d in samples['days']]),
+        ('get_student_daily_progress_summary', app5.get_student_daily_progress_summary, students),
+        ('get_student_daily_activity', app5.get_student_daily_activity, students),
+        ('validate_session', app5.validate_session, [(s,) for s in session_ids]),
+    ]
+
+
+def time_helper(app5, func, arguments, repeat):
+    """Per-call latencies in milliseconds, every call starting from cold caches"""
+    timings = []
+    for i in range(repeat):
+        args = arguments[i % len(arguments)]
+        app5.get_cache().clear()
+        app5.reset_request_cache()
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)
+
+
+def run(sizes, teachers, repeat, pdf_size, seed_value, workdir):
+    os.makedirs(workdir, exist_ok=True)
+    # app5 binds its database path at import time
+    first_db = os.path.join(workdir, f'bench_{sizes[0]}.db')
+    os.environ['REMEDIAL_DB_PATH'] = first_db
+    import analytics
+    import app5
+
+    results = []
+    for size in sizes:
+        db_path = os.path.join(workdir, f'bench_{size}.db')
+        seed.remove_database(db_path)
+        counts = seed.seed(db_path, teachers=teachers, students_per_teacher=size,
+                           pdf_size=pdf_size, seed=seed_value)
+        app5.DB_NAME = db_path
+
+        samples = sample_arguments(db_path, seed_value)
+        session_ids = [app5.create_session(t, 'teacher') for t in samples['teachers']]
+        for name, func, arguments in helper_cases(app5, analytics, samples, session_ids):
+            if not arguments:
+                continue
+            timings = time_helper(app5, func, arguments, repeat)
+            results.append({
+                'size': size,
+                'students': counts['students'],
+                'helper': name,
+                'calls': len(timings),
+                'p50_ms': round(percentile(timings, 50), 4),
+                'p99_ms': round(percentile(timings, 99), 4),
+                'mean_ms': round(sum(timings) / len(timings), 4),
+            })
+            print(f"{size:>6} {name:<36} p50 {results[-1]['p50_ms']:>9.3f} ms"
+                  f"  p99 {results[-1]['p99_ms']:>9.3f} ms", file=sys.stderr)
+        db.close_pool(db_path)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Helpers whose p50 grew by more than tolerance x the baseline's"""
+    previous = {(r['size'], r['helper']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['size'], result['helper']))
+        if before and result['p50_ms'] > before['p50_ms'] * tolerance:
+            regressions.append({
+                'size': result['size'],
+                'helper': result['helper'],
+                'baseline_p50_ms': before['p50_ms'],
+                'p50_ms': result['p50_ms'],
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the app5 data helpers on seeded databases')
+    parser.add_argument('--sizes', default='10,50,200', help='comma-separated students per teacher')
+    parser.add_argument('--teachers', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200, help='timed calls per helper and size')
+    parser.add_argument('--pdf-size', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='where to keep the seeded databases (default: a temp dir)')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed p50 slowdown factor')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(sizes, args.teachers, args.repeat, args.pdf_size, args.seed, args.workdir or tmp)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'teachers': args.teachers,
+            'repeat': args.repeat,
+            'pdf_size': args.pdf_size,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report['regressions'] = compare(results, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
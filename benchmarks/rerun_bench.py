@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db
+import seed
+
+# End-to-end rerun benchmark: drives app5.py headlessly with Streamlit's
+# AppTest against a seeded database and records, for every rerun, the wall
+# time, the number of SQL statements executed and the peak Python memory it
+# allocated. Everything runs in-process on a temp database, so it works
+# offline in CI. The first teacher load also pays for importing the app.
+#
+#   python benchmarks/rerun_bench.py --students-per-teacher 40 --output reruns.json
+
+APP_PATH = os.path.join(ROOT, 'app5.py')
+# Statements that reach the tables; transaction control and PRAGMAs are not counted
+COUNTED = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+
+class QueryCounter:
+    """Counts statements on every pooled connection via sqlite3's trace callback"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def install(self, conn):
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, statement):
+        if statement.lstrip().upper().startswith(COUNTED):
+            with self._lock:
+                self.count += 1
+
+
+def create_session(db_path, username, user_type):
+    """Insert a login session directly, so the benchmark skips the login form"""
+    session_id = str(uuid.uuid4())
+    with db.get_connection(db_path) as conn:
+        conn.execute('''
+            INSERT INTO sessions (session_id, username, user_type, expires_at)
+            VALUES (?, ?, ?, ?)
+        ''', (session_id, username, user_type, datetime.now() + timedelta(days=1)))
+    return session_id
+
+
+def first_with_key(elements, prefix):
+    """First widget whose key starts with prefix, or None"""
+    return next((element for element in elements if (element.key or '').startswith(prefix)), None)
+
+
+def teacher_steps(at):
+    """Reruns a teacher triggers: open the dashboard, rerun, submit daily feedback"""
+    yield 'load', lambda: at.run()
+    yield 'rerun', lambda: at.run()
+
+    def submit_feedback():
+        text_input = first_with_key(at.text_input, 'feedback_')
+        if text_input is None:
+            return at.run()
+        daily_progress_id = text_input.key[len('feedback_'):]
+        text_input.input('Benchmark feedback')
+        return first_with_key(at.button, f'submit_{daily_progress_id}_').click().run()
+    yield 'submit_feedback', submit_feedback
+
+
+def parent_steps(at):
+    """Reruns a parent triggers: open the day grids, rerun, mark a day complete"""
+    yield 'load', lambda: at.run()
+    yield 'rerun', lambda: at.run()
+
+    def mark_complete():
+        button = first_with_key(at.button, 'mark_complete_')
+        return button.click().run() if button else at.run()
+    yield 'mark_complete', mark_complete
+
+
+def measure(role, username, steps, db_path, counter, repeat, timeout):
+    """Run each step repeat times in fresh AppTest sessions and record every rerun"""
+    from streamlit.testing.v1 import AppTest
+
+    records = []
+    for iteration in range(repeat):
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        at.session_state['session_id'] = create_session(db_path, username, role)
+        for step, action in steps(at):
+            counter.count = 0
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            action()
+            wall = time.perf_counter() - start
+            if at.exception:
+                raise RuntimeError(f'{role} {step} raised: {at.exception[0].value}')
+            records.append({
+                'role': role,
+                'step': step,
+                'iteration': iteration,
+                'wall_ms': round(wall * 1000, 3),
+                'queries': counter.count,
+                # Allocated on top of what was already live before the rerun
+                'peak_mib': round((tracemalloc.get_traced_memory()[1] - baseline) / 2**20, 3),
+            })
+            print(f"{role:<8} {step:<16} {records[-1]['wall_ms']:>9.1f} ms"
+                  f"  {records[-1]['queries']:>5} queries  {records[-1]['peak_mib']:>7.2f} MiB",
+                  file=sys.stderr)
+    return records
+
+
+def summarize(records):
+    """Median wall time, queries and peak memory per role and step"""
+    groups = {}
+    for record in records:
+        groups.setdefault((record['role'], record['step']), []).append(record)
+
+    def median(values):
+        values = sorted(values)
+        return values[len(values) // 2]
+
+    return [{
+        'role': role,
+        'step': step,
+        'reruns': len(group),
+        'median_wall_ms': median(r['wall_ms'] for r in group),
+        'median_queries': median(r['queries'] for r in group),
+        'max_peak_mib': max(r['peak_mib'] for r in group),
+    } for (role, step), group in groups.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark full app5.py reruns with AppTest')
+    parser.add_argument('--teachers', type=int, default=3)
+    parser.add_argument('--students-per-teacher', type=int, default=30)
+    parser.add_argument('--pdf-size', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='fresh sessions per role')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds allowed per rerun')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    counter = QueryCounter()
+    db.add_connection_hook(counter.install)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'rerun_bench.db')
+        counts = seed.seed(db_path, teachers=args.teachers, students_per_teacher=args.students_per_teacher,
+                           pdf_size=args.pdf_size, seed=args.seed)
+        # AppTest runs app5.py in this process, so it picks the path up from here
+        os.environ['REMEDIAL_DB_PATH'] = db_path
+
+        tracemalloc.start()
+        records = measure('teacher', seed.teacher_name(0), teacher_steps, db_path, counter,
+                           args.repeat, args.timeout)
+        records += measure('parent', seed.parent_name(0), parent_steps, db_path, counter,
+                           args.repeat, args.timeout)
+        tracemalloc.stop()
+        db.close_pool(db_path)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'rows': counts,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'summary': summarize(records),
+        'reruns': records,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
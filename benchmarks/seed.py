@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog
+import db
+
+# Seeded synthetic school for benchmarks: teachers, parents, students,
+# materials with PDFs of a configurable size, assessments and daily progress.
+# The same arguments always produce the same database, so timings taken on
+# different commits are comparable.
+#
+#   python benchmarks/seed.py bench.db --teachers 10 --students-per-teacher 40
+
+PASSWORD = 'password'
+START = datetime(2024, 6, 1, 9, 0)
+
+
+def teacher_name(n):
+    return f'teacher{n}'
+
+
+def parent_name(n):
+    return f'parent{n}'
+
+
+def remove_database(db_path):
+    """Delete a database file and its WAL companions"""
+    db.close_pool(db_path)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def seed(db_path, teachers=5, students_per_teacher=30, children_per_parent=2,
+         materials_per_student=3, assessments_per_student=4, pdf_size=200_000,
+         distinct_pdfs=20, seed=0):
+    """Create and fill a fresh database; returns row counts per table"""
+    rng = random.Random(seed)
+    db.migrate(db_path)
+    competency_catalog = catalog.load_catalog(db_path)
+    password = hashlib.sha256(PASSWORD.encode()).hexdigest()
+
+    # A pool of PDFs shared round-robin, like a class handed the same worksheet
+    pdfs = [rng.randbytes(pdf_size) for _ in range(distinct_pdfs)]
+    pdf_hashes = [hashlib.sha256(pdf).hexdigest() for pdf in pdfs]
+
+    students = []
+    for t in range(teachers):
+        for i in range(students_per_teacher):
+            n = len(students)
+            students.append({
+                'student_id': f'S{n:06d}',
+                'name': f'Student {n}',
+                'grade': rng.choice(competency_catalog.grades),
+                'teacher': teacher_name(t),
+                'parent': parent_name(n // children_per_parent),
+            })
+    parents = sorted({student['parent'] for student in students})
+
+    users, materials, assessments, scores = [], [], [], []
+    progress, daily_progress, daily_feedback = [], [], []
+    users += [(teacher_name(t), password, 'teacher', f'Teacher {t}') for t in range(teachers)]
+    users += [(parent, password, 'parent', parent.title()) for parent in parents]
+
+    for student in students:
+        sid, teacher, parent = student['student_id'], student['teacher'], student['parent']
+        labels = competency_catalog.competencies(student['grade'])
+
+        # Weekly assessments whose scores drift upwards, with noise
+        base = {label: rng.randint(10, 70) for label in labels}
+        for a in range(assessments_per_student):
+            assessment_id = f'{sid}_A{a}'
+            created_at = START + timedelta(days=7 * a, minutes=rng.randint(0, 600))
+            values = {label: max(0, min(100, base[label] + 5 * a + rng.randint(-10, 10)))
+                      for label in labels}
+            assessments.append((assessment_id, sid, teacher, json.dumps(values), '', str(created_at)))
+            scores += [(assessment_id, competency_catalog.id_of(label), score)
+                       for label, score in values.items()]
+
+        for m in range(materials_per_student):
+            material_id = f'{sid}_M{m}'
+            duration = rng.randint(3, 14)
+            uploaded_at = START + timedelta(days=3 * m, hours=rng.randint(0, 8))
+            materials.append((material_id, sid, teacher, rng.choice(labels), f'Worksheet {m}',
+                              'Synthetic benchmark material', pdf_hashes[len(materials) % distinct_pdfs],
+                              f'worksheet_{m}.pdf', duration, str(uploaded_at)))
+
+            done = rng.randint(0, duration)
+            completed_at = uploaded_at + timedelta(days=duration)
+            progress.append((f'{material_id}_P', sid, material_id, parent, done == duration,
+                             str(completed_at) if done == duration else None))
+
+            for day in range(1, done + 1):
+                daily_progress_id = f'{material_id}_day_{day}'
+                day_at = uploaded_at + timedelta(days=day, hours=rng.randint(0, 4))
+                comment = rng.choice([None, None, 'Finished with some help', 'Enjoyed this one'])
+                daily_progress.append((daily_progress_id, material_id, sid, parent, day, True,
+                                       comment, str(day_at), str(day_at)))
+                if rng.random() < 0.3:
+                    daily_feedback.append((f'{daily_progress_id}_F', daily_progress_id, teacher,
+                                           'Good progress', str(day_at + timedelta(hours=12))))
+
+    with db.get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO users (username, password, user_type, full_name) VALUES (?, ?, ?, ?)
+        ''', users)
+        cursor.executemany('''
+            INSERT INTO students (student_id, name, grade, teacher, parent)
+            VALUES (:student_id, :name, :grade, :teacher, :parent)
+        ''', students)
+        cursor.executemany('''
+            INSERT INTO material_blobs (content_hash, file_data, size) VALUES (?, ?, ?)
+        ''', [(content_hash, pdf, len(pdf)) for content_hash, pdf in zip(pdf_hashes, pdfs)])
+        cursor.executemany('''
+            INSERT INTO materials (material_id, student_id, teacher, competency, title, description,
+                                   content_hash, filename, duration_days, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', materials)
+        cursor.executemany('''
+            INSERT INTO assessments (assessment_id, student_id, teacher, competencies, notes, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', assessments)
+        cursor.executemany('''
+            INSERT INTO assessment_scores (assessment_id, competency_id, score) VALUES (?, ?, ?)
+        ''', scores)
+        cursor.executemany('''
+            INSERT INTO progress (progress_id, student_id, material_id, parent, completed, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', progress)
+        cursor.executemany('''
+            INSERT INTO daily_progress (daily_progress_id, material_id, student_id, parent, day_number,
+                                        completed, parent_comments, completed_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', daily_progress)
+        cursor.executemany('''
+            INSERT INTO daily_feedback (daily_feedback_id, daily_progress_id, teacher, feedback, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', daily_feedback)
+        conn.execute('ANALYZE')
+
+    return {
+        'users': len(users),
+        'students': len(students),
+        'materials': len(materials),
+        'material_blobs': len(pdfs),
+        'assessments': len(assessments),
+        'assessment_scores': len(scores),
+        'progress': len(progress),
+        'daily_progress': len(daily_progress),
+        'daily_feedback': len(daily_feedback),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a fresh database with a synthetic school')
+    parser.add_argument('db_path')
+    parser.add_argument('--teachers', type=int, default=5)
+    parser.add_argument('--students-per-teacher', type=int, default=30)
+    parser.add_argument('--children-per-parent', type=int, default=2)
+    parser.add_argument('--materials-per-student', type=int, default=3)
+    parser.add_argument('--assessments-per-student', type=int, default=4)
+    parser.add_argument('--pdf-size', type=int, default=200_000, help='bytes per synthetic PDF')
+    parser.add_argument('--distinct-pdfs', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--replace', action='store_true', help='delete the database first if it exists')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db_path):
+        if not args.replace:
+            parser.error(f'{args.db_path} already exists; pass --replace to overwrite it')
+        remove_database(args.db_path)
+
+    counts = seed(args.db_path, args.teachers, args.students_per_teacher, args.children_per_parent,
+                  args.materials_per_student, args.assessments_per_student, args.pdf_size,
+                  args.distinct_pdfs, args.seed)
+    print(json.dumps(counts, indent=2))
+
+
+if __name__ == '__main__':
+    main()
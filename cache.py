@@ -0,0 +1,129 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+# Process-wide cache for read helpers, shared by every browser session.
+#
+# Entries expire after a per-key TTL, and writers evict exactly the keys they
+# affect, so a session never reads data older than its own last write. Cached
+# values are shared between sessions and must be treated as read-only.
+
+# Entries kept at most; when full, expired entries are purged first, then the
+# oldest ones, down to PURGE_TO of the limit so the purge is not paid per set()
+MAX_ENTRIES = 10000
+PURGE_TO = 0.9
+
+# Evictions remembered per key for the read/write race check below; older ones
+# collapse into a single floor, which at worst skips caching a few reads
+EVICTION_HISTORY = 10000
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire after a per-key time to live"""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Logical clock of evictions, so a read that raced a write is not cached
+        self._clock = 0
+        self._evicted_at = OrderedDict()
+        # Every key counts as evicted at this clock unless _evicted_at says later
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (True, value) for a live entry, otherwise (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+        return False, None
+
+    def token(self):
+        """Snapshot to pass to set() when the value is computed after this call"""
+        return self._clock
+
+    def set(self, key, value, ttl, token=None):
+        """Store a value for ttl seconds, unless the key was evicted after token"""
+        with self._lock:
+            if token is not None and self._evicted_at.get(key, self._floor) > token:
+                return
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._purge()
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def _purge(self):
+        # Called with the lock held. Entries nobody reads again (e.g. logged-out
+        # sessions) are otherwise only dropped when their key is looked up.
+        now = time.monotonic()
+        for key in [key for key, (expires_at, value) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        target = int(self.max_entries * PURGE_TO)
+        while len(self._entries) > target:
+            # Dicts keep insertion order, so this is the oldest entry
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, *keys):
+        """Evict the given keys"""
+        with self._lock:
+            self._clock += 1
+            for key in keys:
+                self._entries.pop(key, None)
+                self._evicted_at[key] = self._clock
+                self._evicted_at.move_to_end(key)
+            while len(self._evicted_at) > EVICTION_HISTORY:
+                key, clock = self._evicted_at.popitem(last=False)
+                self._floor = clock
+
+    def clear(self):
+        """Evict everything"""
+        with self._lock:
+            self._clock += 1
+            self._entries.clear()
+            self._evicted_at.clear()
+            self._floor = self._clock
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = TTLCache()
+
+
+def get_cache():
+    """The process-wide cache used by @cached helpers"""
+    return _cache
+
+
+def cached(ttl):
+    """Memoize a read helper process-wide, keyed on its name and positional arguments"""
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = (name, *args)
+            hit, value = _cache.get(key)
+            if hit:
+                return value
+            token = _cache.token()
+            value = func(*args)
+            _cache.set(key, value, ttl, token)
+            return value
+
+        def invalidate(*args):
+            """Evict the entry for these arguments"""
+            _cache.invalidate((name, *args))
+
+        wrapper.invalidate = invalidate
+        wrapper.ttl = ttl
+        return wrapper
+    return decorator
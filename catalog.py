@@ -0,0 +1,63 @@
+import json
+import os
+
+import db
+
+# Competency catalog shared by assessments, materials and analytics.
+#
+# The labels per grade live in competencies.json: "by_grade" lists the
+# competencies of grades that have their own curriculum, and every other
+# grade in "grades" uses the "default" list. Loading the catalog registers
+# each label in the competencies table, so the integer IDs it hands out are
+# the same ones assessment_scores and the analytics module key on.
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'competencies.json')
+
+
+class CompetencyCatalog:
+    """Immutable grade -> competencies and label -> ID lookups"""
+
+    def __init__(self, grades, default, by_grade, ids):
+        self.grades = tuple(grades)
+        self._default = tuple(default)
+        self._by_grade = {grade: tuple(by_grade.get(grade, default)) for grade in self.grades}
+        self._ids = dict(ids)
+
+    def competencies(self, grade):
+        """Competency labels for a grade, in display order"""
+        return self._by_grade.get(grade, self._default)
+
+    def id_of(self, label):
+        """Integer ID for a label, or None if it is not in the catalog"""
+        return self._ids.get(label)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def read_catalog(path=CATALOG_PATH):
+    """Parse the catalog data file into (grades, default labels, labels by grade)"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data['grades'], data['default'], data.get('by_grade', {})
+
+
+def load_catalog(db_name, path=CATALOG_PATH):
+    """Read the catalog file, register its labels and return a CompetencyCatalog"""
+    grades, default, by_grade = read_catalog(path)
+    labels = dict.fromkeys(default)
+    for grade_labels in by_grade.values():
+        labels.update(dict.fromkeys(grade_labels))
+
+    with db.get_connection(db_name) as conn:
+        cursor = conn.cursor()
+
+        cursor.executemany('''
+            INSERT OR IGNORE INTO competencies (name) VALUES (?)
+        ''', [(label,) for label in labels])
+
+        # Includes labels only found in older assessments, so they resolve too
+        cursor.execute('SELECT competency_id, name FROM competencies')
+        ids = {name: competency_id for competency_id, name in cursor.fetchall()}
+
+    return CompetencyCatalog(grades, default, by_grade, ids)
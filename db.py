@@ -0,0 +1,735 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import queries
+
+# Shared data-access layer for the remedial platform apps.
+#
+# Streamlit re-executes the app script on every interaction, but imported
+# modules stay loaded for the life of the process, so the pools kept here are
+# shared across reruns and browser sessions.
+
+POOL_SIZE = 8
+
+# PRAGMAs applied to every new connection. WAL lets parents' progress writes
+# and dashboard reads run at the same time instead of blocking each other.
+# Each value can be overridden with an environment variable named after the
+# PRAGMA, e.g. REMEDIAL_DB_BUSY_TIMEOUT=10000.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,        # milliseconds
+    'cache_size': -32000,        # negative means KiB, i.e. ~32 MB
+    'mmap_size': 134217728,      # 128 MB
+}
+
+
+def load_pragmas():
+    """Resolve the connection PRAGMAs, applying any environment overrides"""
+    pragmas = {}
+    for name, default in DEFAULT_PRAGMAS.items():
+        value = os.getenv(f'REMEDIAL_DB_{name.upper()}')
+        if value is None:
+            pragmas[name] = default
+        elif isinstance(default, int):
+            pragmas[name] = int(value)
+        else:
+            pragmas[name] = value
+    return pragmas
+
+
+PRAGMAS = load_pragmas()
+
+# Extra callables run on every new connection, after the PRAGMAs
+_connection_hooks = []
+
+
+def add_connection_hook(hook):
+    """Register a callable that receives each newly created connection"""
+    if hook not in _connection_hooks:
+        _connection_hooks.append(hook)
+
+
+# Class used for new connections; instrumentation swaps in a timing subclass
+_connection_factory = sqlite3.Connection
+
+
+def set_connection_factory(factory):
+    """Use a sqlite3.Connection subclass for connections opened from now on"""
+    global _connection_factory
+    _connection_factory = factory
+
+
+def configure_connection(conn):
+    """Apply the configured PRAGMAs and connection hooks to a new connection"""
+    for name, value in PRAGMAS.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    for hook in _connection_hooks:
+        hook(conn)
+
+
+def pragma_report(db_name):
+    """Compare configured PRAGMA values with what the database reports"""
+    report = []
+    with get_connection(db_name) as conn:
+        for name, configured in PRAGMAS.items():
+            actual = conn.execute(f'PRAGMA {name}').fetchone()
+            # As strings: modes come back as text and sizes as integers, and a
+            # mixed-type column cannot be rendered by st.table
+            report.append({
+                'pragma': name,
+                'configured': str(configured),
+                'actual': str(actual[0]) if actual else None
+            })
+    return report
+
+
+class ConnectionPool:
+    """Small thread-aware pool of SQLite connections for a single database file"""
+
+    def __init__(self, db_name, max_size=POOL_SIZE):
+        self.db_name = db_name
+        self.max_size = max_size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        # Connections outlive the thread that created them, so they must be
+        # usable from whichever script thread checks them out next
+        conn = sqlite3.connect(self.db_name, timeout=PRAGMAS['busy_timeout'] / 1000,
+                               check_same_thread=False, factory=_connection_factory)
+        configure_connection(conn)
+        return conn
+
+    def acquire(self):
+        """Return the calling thread's connection, checking one out if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+        self._local.depth += 1
+        return conn
+
+    def depth(self):
+        """How many nested users currently hold the calling thread's connection"""
+        return getattr(self._local, 'depth', 0)
+
+    def release(self):
+        """Give the calling thread's connection back once its outermost user is done"""
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        conn = self._local.conn
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        """Close every idle connection (connections in use are closed on release)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.max_size = 0
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name):
+    """Get the process-wide pool for a database file"""
+    pool = _pools.get(db_name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(db_name, ConnectionPool(db_name))
+    return pool
+
+
+def close_pool(db_name):
+    """Close and forget the pool for a database file, e.g. before deleting it"""
+    with _pools_lock:
+        pool = _pools.pop(db_name, None)
+    if pool is not None:
+        pool.close_all()
+
+
+@contextmanager
+def get_connection(db_name):
+    """Borrow a pooled connection; commits on success and rolls back on error"""
+    pool = get_pool(db_name)
+    conn = pool.acquire()
+    try:
+        yield conn
+        # Only the outermost user owns the transaction
+        if pool.depth() == 1:
+            conn.commit()
+    except Exception:
+        if pool.depth() == 1:
+            conn.rollback()
+        raise
+    finally:
+        pool.release()
+
+
+# Optional write-behind queue. When REMEDIAL_WRITE_BEHIND=1, small writes are
+# handed to one writer thread per database, which commits whatever has queued
+# up within REMEDIAL_WRITE_BEHIND_MS as a single transaction. One fsync then
+# covers a whole burst of parents' updates, and because only that thread
+# writes, concurrent sessions no longer fight over the write lock.
+WRITE_BEHIND = os.getenv('REMEDIAL_WRITE_BEHIND', '0') == '1'
+WRITE_BEHIND_MS = int(os.getenv('REMEDIAL_WRITE_BEHIND_MS', '5'))
+WRITE_BEHIND_BATCH = 200
+
+
+class WriteQueue:
+    """Single writer thread that commits queued writes in group transactions"""
+
+    def __init__(self, db_name, window_ms=WRITE_BEHIND_MS, max_batch=WRITE_BEHIND_BATCH):
+        self.db_name = db_name
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, on_commit=None):
+        """Queue func(conn, *args); the future resolves to its result once committed"""
+        future = Future()
+        self._queue.put((future, func, args, on_commit))
+        return future
+
+    def _collect(self):
+        # Block for the first write, then gather whatever arrives within the window
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            results = []
+            try:
+                with get_connection(self.db_name) as conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    for future, func, args, on_commit in batch:
+                        # A savepoint per write, so one bad write fails alone
+                        conn.execute('SAVEPOINT write_behind')
+                        try:
+                            results.append((future, on_commit, func(conn, *args), None))
+                            conn.execute('RELEASE write_behind')
+                        except Exception as e:
+                            conn.execute('ROLLBACK TO write_behind')
+                            conn.execute('RELEASE write_behind')
+                            results.append((future, on_commit, None, e))
+            except Exception as e:
+                # The commit itself failed, so nothing in the batch was written
+                for future, func, args, on_commit in batch:
+                    future.set_exception(e)
+                continue
+
+            # Acknowledge only after the commit, so callers can read their writes
+            for future, on_commit, result, error in results:
+                if error is None:
+                    _resolve(future, on_commit, result)
+                else:
+                    future.set_exception(error)
+
+
+def _resolve(future, on_commit, result):
+    # on_commit (e.g. cache eviction) runs before the future resolves: set_result
+    # wakes waiters before it runs done callbacks, so those could come too late
+    try:
+        if on_commit is not None:
+            on_commit(result)
+    except Exception as e:
+        future.set_exception(e)
+    else:
+        future.set_result(result)
+
+
+_write_queues = {}
+
+
+def submit_write(db_name, func, *args, on_commit=None):
+    """Run func(conn, *args) as a write and return a Future for its result
+
+    With write-behind enabled the write joins the next group commit; otherwise
+    it runs and commits immediately and the returned future is already done.
+    on_commit(result) is called once the write has committed, before the
+    future resolves, so anything it evicts is gone by the time .result() returns.
+    Raises RuntimeError if the calling thread is already inside get_connection()
+    for db_name: the write would only commit with that outer transaction.
+    """
+    if get_pool(db_name).depth():
+        raise RuntimeError('submit_write() cannot be nested inside get_connection() on the same database')
+    if WRITE_BEHIND:
+        writer = _write_queues.get(db_name)
+        if writer is None:
+            with _pools_lock:
+                writer = _write_queues.get(db_name)
+                if writer is None:
+                    writer = _write_queues[db_name] = WriteQueue(db_name)
+        return writer.submit(func, *args, on_commit=on_commit)
+
+    future = Future()
+    try:
+        with get_connection(db_name) as conn:
+            result = func(conn, *args)
+    except Exception as e:
+        future.set_exception(e)
+    else:
+        _resolve(future, on_commit, result)
+    return future
+
+
+def write_queue_depth():
+    """Writes queued but not yet picked up, across all write-behind queues"""
+    return sum(writer._queue.qsize() for writer in list(_write_queues.values()))
+
+
+# Incremental BLOB I/O, so uploaded PDFs are hashed and written in fixed-size
+# chunks instead of as one bytes object per copy. Downloads read the whole
+# BLOB in one statement, since st.download_button needs the full payload anyway.
+BLOB_CHUNK_SIZE = 256 * 1024
+
+
+def stream_size(stream):
+    """Number of bytes left to read in a seekable file-like object"""
+    position = stream.tell()
+    end = stream.seek(0, os.SEEK_END)
+    stream.seek(position)
+    return end - position
+
+
+def hash_stream(stream, chunk_size=BLOB_CHUNK_SIZE):
+    """SHA-256 hex digest of a seekable file-like object, leaving its position unchanged"""
+    position = stream.tell()
+    digest = hashlib.sha256()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+    stream.seek(position)
+    return digest.hexdigest()
+
+
+def write_blob(conn, table, column, rowid, stream, chunk_size=BLOB_CHUNK_SIZE):
+    """Stream a file-like object into a zeroblob() placeholder of the same size"""
+    if not hasattr(conn, 'blobopen'):
+        # Python < 3.11: no incremental API, write the value in one statement
+        conn.execute(f'UPDATE {table} SET {column} = ? WHERE rowid = ?', (stream.read(), rowid))
+        return
+    with conn.blobopen(table, column, rowid) as blob:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            blob.write(chunk)
+
+
+def insert_assessment_scores(conn, assessment_id, competencies):
+    """Write one assessment_scores row per {competency name: score}, registering new names"""
+    cursor = conn.cursor()
+    cursor.executemany('''
+        INSERT OR IGNORE INTO competencies (name) VALUES (?)
+    ''', [(name,) for name in competencies])
+    cursor.executemany('''
+        INSERT INTO assessment_scores (assessment_id, competency_id, score)
+        SELECT ?, competency_id, ? FROM competencies WHERE name = ?
+    ''', [(assessment_id, score, name) for name, score in competencies.items()])
+
+
+# Secondary indexes for the hot lookups in the data helpers. Changes to this
+# set ship as a new migration that calls ensure_indexes(); indexes named idx_*
+# that are no longer listed here are dropped.
+INDEXES = {
+    # Covering for both the student id lists and the per-user student directory
+    'idx_students_teacher_directory': 'students (teacher, student_id, name, grade, parent)',
+    'idx_students_parent_directory': 'students (parent, student_id, name, grade, teacher)',
+    # Matches ORDER BY uploaded_at DESC when listing a student's materials
+    'idx_materials_student_uploaded': 'materials (student_id, uploaded_at)',
+    'idx_assessments_student_created': 'assessments (student_id, created_at)',
+    'idx_progress_student_material': 'progress (student_id, material_id)',
+    'idx_progress_student_completed': 'progress (student_id, completed, completed_at)',
+    'idx_feedback_progress_created': 'feedback (progress_id, created_at)',
+    # Serves both the per-material day list and the per-student summary
+    'idx_daily_progress_student_material_day': 'daily_progress (student_id, material_id, day_number)',
+    'idx_daily_feedback_progress_created': 'daily_feedback (daily_progress_id, created_at)',
+    'idx_sessions_expires': 'sessions (expires_at)',
+}
+
+
+def ensure_indexes(conn):
+    """Create missing secondary indexes and drop retired ones (idempotent)"""
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx\\_%' ESCAPE '\\'"
+    )}
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for name in existing - INDEXES.keys():
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    for name, definition in INDEXES.items():
+        # Indexes on tables added by a later migration are created by that migration
+        if definition.split(' ', 1)[0] in tables:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+
+
+# Schema migrations, keyed on PRAGMA user_version. Each entry upgrades the
+# database from the previous version; append new ones, never edit old ones.
+
+def _create_base_schema(conn):
+    """Version 1: all application tables"""
+    # Users table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            user_type TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Students table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS students (
+            student_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            grade TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            parent TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (teacher) REFERENCES users(username),
+            FOREIGN KEY (parent) REFERENCES users(username)
+        )
+    ''')
+
+    # Assessments table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS assessments (
+            assessment_id TEXT PRIMARY KEY,
+            student_id TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            competencies TEXT NOT NULL,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(student_id),
+            FOREIGN KEY (teacher) REFERENCES users(username)
+        )
+    ''')
+
+    # Materials table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS materials (
+            material_id TEXT PRIMARY KEY,
+            student_id TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            competency TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            file_data BLOB NOT NULL,
+            filename TEXT NOT NULL,
+            duration_days INTEGER NOT NULL,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(student_id),
+            FOREIGN KEY (teacher) REFERENCES users(username)
+        )
+    ''')
+
+    # Progress table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS progress (
+            progress_id TEXT PRIMARY KEY,
+            student_id TEXT NOT NULL,
+            material_id TEXT NOT NULL,
+            parent TEXT NOT NULL,
+            completed BOOLEAN DEFAULT FALSE,
+            completed_at TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(student_id),
+            FOREIGN KEY (material_id) REFERENCES materials(material_id),
+            FOREIGN KEY (parent) REFERENCES users(username)
+        )
+    ''')
+
+    # Feedback table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS feedback (
+            feedback_id TEXT PRIMARY KEY,
+            progress_id TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            student_id TEXT NOT NULL,
+            feedback TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (progress_id) REFERENCES progress(progress_id),
+            FOREIGN KEY (teacher) REFERENCES users(username),
+            FOREIGN KEY (student_id) REFERENCES students(student_id)
+        )
+    ''')
+
+    # Daily progress tracking table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_progress (
+            daily_progress_id TEXT PRIMARY KEY,
+            material_id TEXT NOT NULL,
+            student_id TEXT NOT NULL,
+            parent TEXT NOT NULL,
+            day_number INTEGER NOT NULL,
+            completed BOOLEAN DEFAULT FALSE,
+            parent_comments TEXT,
+            completed_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (material_id) REFERENCES materials(material_id),
+            FOREIGN KEY (student_id) REFERENCES students(student_id),
+            FOREIGN KEY (parent) REFERENCES users(username)
+        )
+    ''')
+
+    # Teacher feedback on daily progress
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_feedback (
+            daily_feedback_id TEXT PRIMARY KEY,
+            daily_progress_id TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            feedback TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (daily_progress_id) REFERENCES daily_progress(daily_progress_id),
+            FOREIGN KEY (teacher) REFERENCES users(username)
+        )
+    ''')
+
+    # Add sessions table for persistent login
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            user_type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    ''')
+
+
+def _split_material_blobs(conn):
+    """Version 3: move PDFs into a content-addressed table shared by materials"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS material_blobs (
+            content_hash TEXT PRIMARY KEY,
+            file_data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Deduplicate existing uploads: one blob per distinct SHA-256
+    conn.create_function('sha256_hex', 1, lambda data: hashlib.sha256(data).hexdigest(),
+                         deterministic=True)
+    conn.execute('''
+        CREATE TEMP TABLE material_hashes AS
+        SELECT material_id, sha256_hex(file_data) AS content_hash FROM materials
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO material_blobs (content_hash, file_data, size)
+        SELECT h.content_hash, m.file_data, length(m.file_data)
+        FROM materials m JOIN temp.material_hashes h ON h.material_id = m.material_id
+    ''')
+
+    # Rebuild materials as lightweight assignment rows referencing the blob
+    conn.execute('''
+        CREATE TABLE materials_new (
+            material_id TEXT PRIMARY KEY,
+            student_id TEXT NOT NULL,
+            teacher TEXT NOT NULL,
+            competency TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            content_hash TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            duration_days INTEGER NOT NULL,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(student_id),
+            FOREIGN KEY (teacher) REFERENCES users(username),
+            FOREIGN KEY (content_hash) REFERENCES material_blobs(content_hash)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO materials_new (material_id, student_id, teacher, competency, title, description,
+                                   content_hash, filename, duration_days, uploaded_at)
+        SELECT m.material_id, m.student_id, m.teacher, m.competency, m.title, m.description,
+               h.content_hash, m.filename, m.duration_days, m.uploaded_at
+        FROM materials m JOIN temp.material_hashes h ON h.material_id = m.material_id
+    ''')
+    conn.execute('DROP TABLE temp.material_hashes')
+    conn.execute('DROP TABLE materials')
+    conn.execute('ALTER TABLE materials_new RENAME TO materials')
+    ensure_indexes(conn)
+
+
+def _normalize_assessment_scores(conn):
+    """Version 4: one row per assessed competency, alongside the JSON column"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS competencies (
+            competency_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS assessment_scores (
+            assessment_id TEXT NOT NULL,
+            competency_id INTEGER NOT NULL,
+            score INTEGER NOT NULL,
+            PRIMARY KEY (assessment_id, competency_id),
+            FOREIGN KEY (assessment_id) REFERENCES assessments(assessment_id),
+            FOREIGN KEY (competency_id) REFERENCES competencies(competency_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Backfill from the JSON column without leaving SQLite
+    conn.execute('''
+        INSERT OR IGNORE INTO competencies (name)
+        SELECT DISTINCT j.key FROM assessments a, json_each(a.competencies) j
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO assessment_scores (assessment_id, competency_id, score)
+        SELECT a.assessment_id, c.competency_id, j.value
+        FROM assessments a, json_each(a.competencies) j
+        JOIN competencies c ON c.name = j.key
+    ''')
+
+    ensure_indexes(conn)
+
+
+MIGRATIONS = [
+    (1, 'base schema', _create_base_schema),
+    (2, 'secondary indexes', ensure_indexes),
+    (3, 'content-addressed material store', _split_material_blobs),
+    (4, 'normalized assessment scores', _normalize_assessment_scores),
+    # Drops idx_assessment_scores_competency: scores are only read by assessment
+    (5, 'secondary indexes', ensure_indexes),
+    # Student directory indexes replace the id-only teacher and parent ones
+    (6, 'secondary indexes', ensure_indexes),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    """Read the schema version recorded in the database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(db_name):
+    """Apply any pending migrations and return the resulting schema version"""
+    with get_connection(db_name) as conn:
+        # Cheap check first: an up-to-date database needs no DDL at all
+        version = schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            return version
+
+        # Take the write lock, then re-read in case another process got here first
+        conn.execute('BEGIN IMMEDIATE')
+        version = schema_version(conn)
+        for target, description, upgrade in MIGRATIONS:
+            if target > version:
+                upgrade(conn)
+                conn.execute(f'PRAGMA user_version = {target}')
+                version = target
+    return version
+
+
+# Every indexed lookup with representative parameters, checked with EXPLAIN
+# QUERY PLAN by check_query_plans(). The statements are the ones the helpers
+# execute, imported from queries.py, so the check cannot drift from them.
+HOT_QUERIES = {
+    'authenticate_user': (queries.AUTHENTICATE_USER_SQL, ('u', 'x')),
+    'get_user_info': (queries.USER_INFO_SQL, ('u',)),
+    'get_user_students (teacher)': (queries.USER_STUDENTS_SQL['teacher'], ('t',)),
+    'get_user_students (parent)': (queries.USER_STUDENTS_SQL['parent'], ('p',)),
+    'load_student_directory (teacher)': (queries.STUDENT_DIRECTORY_SQL['teacher'], ('t',)),
+    'load_student_directory (parent)': (queries.STUDENT_DIRECTORY_SQL['parent'], ('p',)),
+    'get_student_info': (queries.STUDENT_INFO_SQL, ('s',)),
+    'get_latest_assessment': (queries.LATEST_ASSESSMENT_SQL, ('s',)),
+    'get_assessment_history': (queries.ASSESSMENT_HISTORY_SQL, ('s',)),
+    'class_competency_analytics': (queries.CLASS_SCORES_SQL, ('t',)),
+    'assign_material (own students)': (queries.in_list(queries.OWN_STUDENTS_SQL, 2), ('t', 's1', 's2')),
+    'assign_material (existing materials)': (queries.in_list(queries.EXISTING_MATERIALS_SQL, 2), ('m1', 'm2')),
+    'get_student_materials': (queries.STUDENT_MATERIALS_SQL, ('s',)),
+    'get_material_file': (queries.MATERIAL_FILE_SQL, ('m',)),
+    'get_progress': (queries.PROGRESS_SQL, ('s', 'm')),
+    'get_student_progress': (queries.STUDENT_PROGRESS_SQL, ('s',)),
+    'get_feedback': (queries.FEEDBACK_SQL, ('p',)),
+    'get_completed_activities': (queries.COMPLETED_ACTIVITIES_SQL, ('s',)),
+    'get_daily_progress': (queries.DAILY_PROGRESS_SQL, ('m', 's')),
+    'save_daily_feedback (student lookup)': (queries.DAILY_PROGRESS_STUDENT_SQL, ('d',)),
+    'get_daily_feedback': (queries.DAILY_FEEDBACK_SQL, ('d',)),
+    'get_student_daily_progress_summary': (queries.STUDENT_DAILY_PROGRESS_SUMMARY_SQL, ('s',)),
+    'get_student_daily_activity': (queries.STUDENT_DAILY_ACTIVITY_SQL, ('s',)),
+    'get_class_overview': (queries.CLASS_OVERVIEW_SQL, ('t', 't')),
+    'validate_session': (queries.VALIDATE_SESSION_SQL, ('x', '2000-01-01')),
+    'sweep_expired_sessions': (queries.DELETE_EXPIRED_SESSIONS_SQL, ('2000-01-01',)),
+}
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def check_query_plans(conn):
+    """Return {query name: plan} for every registered query that falls back to a table scan"""
+    failures = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = explain(conn, sql, params)
+        if any(line.startswith('SCAN') and line != 'SCAN CONSTANT ROW' for line in plan):
+            failures[name] = plan
+    return failures
+
+
+def assert_query_plans(conn):
+    """Raise RuntimeError if any registered query falls back to a table scan"""
+    failures = check_query_plans(conn)
+    if failures:
+        details = '; '.join(f"{name}: {' / '.join(plan)}" for name, plan in failures.items())
+        raise RuntimeError(f'Query plan self-check failed: {details}')
+
+
+if __name__ == '__main__':
+    # python db.py path/to/remedial_platform.db
+    import sys
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'remedial_platform.db')
+    with get_connection(db_path) as conn:
+        for name, plan in check_query_plans(conn).items():
+            print(f'SCAN  {name}: {" / ".join(plan)}')
+        try:
+            assert_query_plans(conn)
+        except RuntimeError:
+            sys.exit(1)
+    print(f'All {len(HOT_QUERIES)} registered queries use an index')
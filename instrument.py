@@ -0,0 +1,207 @@
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import db
+import metrics
+
+# Opt-in instrumentation of the data layer.
+#
+# With REMEDIAL_INSTRUMENT=1, every decorated helper records its calls,
+# duration and rows returned, both per rerun and since the process started,
+# and every SQL statement is timed through a sqlite3.Connection subclass.
+# Statements slower than REMEDIAL_SLOW_QUERY_MS are logged with their EXPLAIN
+# QUERY PLAN. When disabled, helper() returns the function unchanged and
+# connections are plain sqlite3 connections, so there is nothing to pay for.
+# When only the metrics exporter is on, helpers are timed for its latency
+# histogram but nothing else is recorded.
+
+ENABLED = os.getenv('REMEDIAL_INSTRUMENT', '0') == '1'
+SLOW_QUERY_MS = float(os.getenv('REMEDIAL_SLOW_QUERY_MS', '100'))
+SLOW_LOG_SIZE = 50
+
+logger = logging.getLogger('remedial.slow_query')
+
+_lock = threading.Lock()
+_totals = {}
+_local = threading.local()
+slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+
+
+class HelperStats:
+    """Calls, time and rows accumulated for one helper"""
+
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'rows')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+
+    def add(self, seconds, rows):
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.rows += rows
+
+    def as_dict(self, name):
+        return {
+            'helper': name,
+            'calls': self.calls,
+            'total_ms': round(self.seconds * 1000, 2),
+            'max_ms': round(self.max_seconds * 1000, 2),
+            'rows': self.rows,
+        }
+
+
+def row_count(result):
+    """Rows a helper returned: the length of a collection, else 0 or 1"""
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple, dict, set)):
+        return len(result)
+    return 1
+
+
+def _record(name, seconds, rows):
+    with _lock:
+        _totals.setdefault(name, HelperStats()).add(seconds, rows)
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        rerun['helpers'].setdefault(name, HelperStats()).add(seconds, rows)
+
+
+def helper(func):
+    """Record calls, duration and rows of a data helper (a no-op unless enabled)"""
+    if not (ENABLED or metrics.ENABLED):
+        return func
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        if ENABLED:
+            _record(name, seconds, row_count(result))
+        if metrics.ENABLED:
+            metrics.HELPER_SECONDS.observe(seconds, helper=name)
+        return result
+    return wrapper
+
+
+def begin_rerun():
+    """Start collecting per-rerun statistics on the calling script thread"""
+    if ENABLED:
+        _local.rerun = {'helpers': {}, 'queries': 0, 'query_seconds': 0.0}
+
+
+def end_rerun():
+    """Stop collecting and return this rerun's statistics, or None if disabled"""
+    rerun = getattr(_local, 'rerun', None)
+    _local.rerun = None
+    if rerun is None:
+        return None
+    return {
+        'helpers': sorted((stats.as_dict(name) for name, stats in rerun['helpers'].items()),
+                          key=lambda row: row['total_ms'], reverse=True),
+        'queries': rerun['queries'],
+        'query_ms': round(rerun['query_seconds'] * 1000, 2),
+    }
+
+
+def helper_totals():
+    """Per-helper statistics since the process started, slowest first"""
+    with _lock:
+        rows = [stats.as_dict(name) for name, stats in _totals.items()]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def _log_slow_query(conn, sql, params, seconds):
+    plan = []
+    if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        try:
+            # The base class method, so the plan lookup is not itself timed
+            plan = [row[3] for row in sqlite3.Connection.execute(conn, f'EXPLAIN QUERY PLAN {sql}', params)]
+        except sqlite3.Error:
+            pass
+    entry = {
+        'at': datetime.now().isoformat(timespec='seconds'),
+        'ms': round(seconds * 1000, 2),
+        'sql': ' '.join(sql.split()),
+        'plan': ' / '.join(plan),
+    }
+    slow_queries.append(entry)
+    logger.warning('Slow query (%.1f ms): %s | plan: %s', entry['ms'], entry['sql'], entry['plan'] or '-')
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that times each statement across execute and its fetches"""
+
+    _sql = None
+    _params = ()
+    _seconds = 0.0
+    _logged = False
+
+    def _time(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._add(time.perf_counter() - start)
+
+    def _start(self, sql, params):
+        self._sql, self._params, self._seconds, self._logged = sql, params, 0.0, False
+        rerun = getattr(_local, 'rerun', None)
+        if rerun is not None:
+            rerun['queries'] += 1
+
+    def _add(self, seconds):
+        self._seconds += seconds
+        rerun = getattr(_local, 'rerun', None)
+        if rerun is not None:
+            rerun['query_seconds'] += seconds
+        if not self._logged and self._seconds * 1000 >= SLOW_QUERY_MS:
+            self._logged = True
+            _log_slow_query(self.connection, self._sql, self._params, self._seconds)
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        return self._time(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Logged without a plan: there is no single parameter set to explain
+        self._start(sql, ())
+        return self._time(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._time(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._time(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._time(super().fetchall)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the execute() shortcuts, are timed"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+if ENABLED:
+    db.set_connection_factory(TimedConnection)
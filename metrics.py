@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import db
+
+# In-process metrics in the Prometheus text exposition format.
+#
+# Counters and histograms live in this process and cost a lock and a dict
+# update to record. Nothing is published unless one of these is set:
+#   REMEDIAL_METRICS_PORT  serve http://<host>:<port>/metrics from a thread
+#   REMEDIAL_METRICS_FILE  rewrite this file every REMEDIAL_METRICS_INTERVAL
+#                          seconds (e.g. for node_exporter's textfile collector)
+# Neither needs anything outside the standard library.
+
+METRICS_PORT = int(os.getenv('REMEDIAL_METRICS_PORT', '0'))
+METRICS_FILE = os.getenv('REMEDIAL_METRICS_FILE')
+METRICS_INTERVAL = float(os.getenv('REMEDIAL_METRICS_INTERVAL', '15'))
+ENABLED = bool(METRICS_PORT or METRICS_FILE)
+
+# Latency buckets in seconds, tuned for SQLite helpers and reruns
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for a named metric family with a fixed set of label names"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """(suffix, label pairs, value) tuples for the exposition"""
+        raise NotImplementedError
+
+    def family(self):
+        """Name for the HELP and TYPE lines"""
+        return self.name
+
+    def render(self):
+        lines = [f'# HELP {self.family()} {self.documentation}', f'# TYPE {self.family()} {self.kind}']
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def family(self):
+        # Counter samples carry the _total suffix, and TYPE must name the sample
+        return f'{self.name}_total'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [('_total', key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    """Point-in-time value read from a callback when the metrics are rendered"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self):
+        return [('', (), self.callback())]
+
+
+class Histogram(Metric):
+    """Distribution of observed values over cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(('_bucket', key + (('le', _format_value(bound)),), cumulative))
+            samples.append(('_sum', key, total))
+            samples.append(('_count', key, cumulative))
+        return samples
+
+
+class Registry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text format"""
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+RERUNS = REGISTRY.register(Counter(
+    'remedial_reruns', 'Full script reruns by dashboard view', ['view']))
+RERUN_SECONDS = REGISTRY.register(Histogram(
+    'remedial_rerun_seconds', 'Wall time of full script reruns', ['view']))
+LOGIN_ATTEMPTS = REGISTRY.register(Counter(
+    'remedial_login_attempts', 'Login attempts by outcome', ['result']))
+SESSIONS_VALIDATED = REGISTRY.register(Counter(
+    'remedial_sessions_validated', 'Session validations by outcome', ['result']))
+HELPER_SECONDS = REGISTRY.register(Histogram(
+    'remedial_db_helper_seconds', 'Latency of data helpers, including their SQL', ['helper']))
+BLOB_BYTES = REGISTRY.register(Counter(
+    'remedial_blob_bytes_served', 'Material file bytes read from the database for download'))
+WRITE_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'remedial_write_queue_depth', 'Writes waiting in the write-behind queue', db.write_queue_depth))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the app's log
+
+
+def serve(port):
+    """Serve /metrics on the given port from a daemon thread"""
+    server = ThreadingHTTPServer(('', port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def write_file(path):
+    """Atomically replace path with the current metrics"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+
+
+def _write_periodically(path, interval):
+    while True:
+        try:
+            write_file(path)
+        except OSError:
+            pass  # e.g. directory not mounted yet; the next pass retries
+        time.sleep(interval)
+
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+_server = None
+
+
+def start_exporter():
+    """Start whichever exporters are configured, once per process; returns the HTTP server, if any"""
+    global _exporter_started, _server
+    with _exporter_lock:
+        if not _exporter_started:
+            _exporter_started = True
+            if METRICS_PORT:
+                _server = serve(METRICS_PORT)
+            if METRICS_FILE:
+                threading.Thread(target=_write_periodically, args=(METRICS_FILE, METRICS_INTERVAL),
+                                 name='metrics-file', daemon=True).start()
+    return _server
@@ -0,0 +1,113 @@
+import cProfile
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+# Opt-in rerun profiling.
+#
+# REMEDIAL_PROFILE=1 profiles every rerun; otherwise a session can opt in with
+# the ?profile=1 query parameter. Each profiled rerun runs under cProfile and
+# a stack sampler on the script thread, and the last few results are kept per
+# user role for admins to download: cProfile output as a .pstats file (for
+# pstats or snakeviz), samples as collapsed stacks (for flamegraph.pl or
+# speedscope).
+
+PROFILE_ALL = os.getenv('REMEDIAL_PROFILE', '0') == '1'
+QUERY_PARAM = 'profile'
+PROFILES_PER_ROLE = int(os.getenv('REMEDIAL_PROFILE_KEEP', '10'))
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+_lock = threading.Lock()
+_profiles = {}
+
+
+def requested(query_params):
+    """Whether this rerun should be profiled"""
+    return PROFILE_ALL or query_params.get(QUERY_PARAM) == '1'
+
+
+def frame_label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name='rerun-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def collapsed(self):
+        """Samples in the collapsed-stack format: 'root;...;leaf count' per line"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+class RerunProfile:
+    """A running profile of one script rerun; call finish() when the rerun ends"""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._profiler = cProfile.Profile()
+        try:
+            self._profiler.enable()
+        except ValueError:
+            # Another session is already under cProfile; fall back to sampling only
+            self._profiler = None
+        self._sampler = StackSampler(threading.get_ident())
+        self._sampler.start()
+
+    def finish(self, role):
+        """Stop profiling and keep the result among the role's recent profiles"""
+        wall = time.perf_counter() - self._start
+        self._sampler.stop()
+        pstats_data = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            # The same marshalled dict pstats.Stats.dump_stats() writes
+            pstats_data = marshal.dumps(pstats.Stats(self._profiler).stats)
+
+        result = {
+            'role': role,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_ms': round(wall * 1000, 1),
+            'samples': sum(self._sampler.counts.values()),
+            'pstats': pstats_data,
+            'collapsed': self._sampler.collapsed(),
+        }
+        with _lock:
+            _profiles.setdefault(role, deque(maxlen=PROFILES_PER_ROLE)).append(result)
+        return result
+
+
+def start():
+    """Begin profiling the current rerun"""
+    return RerunProfile()
+
+
+def recent_profiles():
+    """{role: profiles newest first} for every role profiled so far"""
+    with _lock:
+        return {role: list(reversed(profiles)) for role, profiles in _profiles.items()}
@@ -0,0 +1,195 @@
+# SQL statements behind the indexed lookups of the data helpers.
+#
+# Each statement lives here once: the helpers in app5.py and analytics.py
+# execute these constants, and db.HOT_QUERIES registers the same objects for
+# the EXPLAIN QUERY PLAN self-check, so the check always tests the SQL the
+# app actually runs. Statements with a variable IN list are templates with a
+# {placeholders} field; see in_list().
+
+
+def in_list(template, count):
+    """Fill a template's {placeholders} field with count parameter markers"""
+    return template.format(placeholders=', '.join('?' * count))
+
+
+AUTHENTICATE_USER_SQL = '''
+    SELECT user_type FROM users
+    WHERE username = ? AND password = ?
+'''
+
+USER_INFO_SQL = '''
+    SELECT full_name, user_type FROM users WHERE username = ?
+'''
+
+# Keyed on user type, which is also the students column to filter on
+USER_STUDENTS_SQL = {
+    'teacher': '''
+        SELECT student_id FROM students WHERE teacher = ?
+    ''',
+    'parent': '''
+        SELECT student_id FROM students WHERE parent = ?
+    ''',
+}
+
+STUDENT_DIRECTORY_SQL = {
+    'teacher': '''
+        SELECT student_id, name, grade, teacher, parent FROM students WHERE teacher = ?
+    ''',
+    'parent': '''
+        SELECT student_id, name, grade, teacher, parent FROM students WHERE parent = ?
+    ''',
+}
+
+STUDENT_INFO_SQL = '''
+    SELECT name, grade, teacher, parent FROM students WHERE student_id = ?
+'''
+
+LATEST_ASSESSMENT_SQL = '''
+    SELECT competencies, notes, created_at FROM assessments
+    WHERE student_id = ?
+    ORDER BY created_at DESC
+    LIMIT 1
+'''
+
+# One range scan of the student's assessments, oldest first
+ASSESSMENT_HISTORY_SQL = '''
+    SELECT a.created_at, c.name, sc.score
+    FROM assessments a
+    JOIN assessment_scores sc ON sc.assessment_id = a.assessment_id
+    JOIN competencies c ON c.competency_id = sc.competency_id
+    WHERE a.student_id = ?
+    ORDER BY a.created_at
+'''
+
+# The latest two assessments per student: recency 0 is the latest, 1 the one
+# before it, so deltas need no second round trip
+CLASS_SCORES_SQL = '''
+    SELECT a.student_id, sc.competency_id, c.name, sc.score,
+           (SELECT COUNT(*) FROM assessments b
+            WHERE b.student_id = a.student_id AND b.created_at > a.created_at) AS recency
+    FROM students s
+    JOIN assessments a ON a.student_id = s.student_id
+    JOIN assessment_scores sc ON sc.assessment_id = a.assessment_id
+    JOIN competencies c ON c.competency_id = sc.competency_id
+    WHERE s.teacher = ? AND a.assessment_id IN (
+        SELECT assessment_id FROM assessments
+        WHERE student_id = s.student_id ORDER BY created_at DESC LIMIT 2
+    )
+'''
+
+# Only the teacher's own students can be assigned material
+OWN_STUDENTS_SQL = '''
+    SELECT student_id FROM students WHERE teacher = ? AND student_id IN ({placeholders})
+'''
+
+EXISTING_MATERIALS_SQL = '''
+    SELECT material_id FROM materials WHERE material_id IN ({placeholders})
+'''
+
+STUDENT_MATERIALS_SQL = '''
+    SELECT material_id, competency, title, description, filename, duration_days, uploaded_at
+    FROM materials WHERE student_id = ?
+    ORDER BY uploaded_at DESC
+'''
+
+MATERIAL_FILE_SQL = '''
+    SELECT b.file_data FROM materials m
+    JOIN material_blobs b ON b.content_hash = m.content_hash
+    WHERE m.material_id = ?
+'''
+
+PROGRESS_SQL = '''
+    SELECT completed, completed_at FROM progress
+    WHERE student_id = ? AND material_id = ?
+'''
+
+STUDENT_PROGRESS_SQL = '''
+    SELECT p.progress_id, p.material_id, p.completed, p.completed_at, m.title, m.competency
+    FROM progress p
+    JOIN materials m ON p.material_id = m.material_id
+    WHERE p.student_id = ?
+    ORDER BY p.completed_at DESC
+'''
+
+FEEDBACK_SQL = '''
+    SELECT feedback, created_at FROM feedback
+    WHERE progress_id = ?
+    ORDER BY created_at DESC
+'''
+
+COMPLETED_ACTIVITIES_SQL = '''
+    SELECT p.progress_id, m.title, m.competency, p.completed_at
+    FROM progress p
+    JOIN materials m ON p.material_id = m.material_id
+    WHERE p.student_id = ? AND p.completed = 1
+    ORDER BY p.completed_at DESC
+'''
+
+DAILY_PROGRESS_SQL = '''
+    SELECT daily_progress_id, day_number, completed, parent_comments, completed_at
+    FROM daily_progress
+    WHERE material_id = ? AND student_id = ?
+    ORDER BY day_number
+'''
+
+DAILY_PROGRESS_STUDENT_SQL = '''
+    SELECT student_id FROM daily_progress WHERE daily_progress_id = ?
+'''
+
+DAILY_FEEDBACK_SQL = '''
+    SELECT feedback, created_at FROM daily_feedback
+    WHERE daily_progress_id = ?
+    ORDER BY created_at DESC
+'''
+
+STUDENT_DAILY_PROGRESS_SUMMARY_SQL = '''
+    SELECT dp.daily_progress_id, dp.material_id, dp.day_number, dp.completed,
+           dp.parent_comments, dp.completed_at, m.title, m.competency
+    FROM daily_progress dp
+    JOIN materials m ON dp.material_id = m.material_id
+    WHERE dp.student_id = ?
+    ORDER BY m.uploaded_at DESC, dp.day_number
+'''
+
+# Days are counted per material first so joining them does not multiply the
+# materials' durations
+CLASS_OVERVIEW_SQL = '''
+    SELECT s.student_id, s.name, s.grade, m.competency,
+           COUNT(m.material_id),
+           COALESCE(SUM(m.duration_days), 0),
+           COALESCE(SUM(MIN(d.days_completed, m.duration_days)), 0),
+           MAX(d.last_activity)
+    FROM students s
+    LEFT JOIN materials m ON m.student_id = s.student_id
+    LEFT JOIN (
+        SELECT student_id, material_id,
+               COUNT(DISTINCT CASE WHEN completed THEN day_number END) AS days_completed,
+               MAX(COALESCE(completed_at, created_at)) AS last_activity
+        FROM daily_progress
+        WHERE student_id IN (SELECT student_id FROM students WHERE teacher = ?)
+        GROUP BY student_id, material_id
+    ) d ON d.student_id = m.student_id AND d.material_id = m.material_id
+    WHERE s.teacher = ?
+    GROUP BY s.student_id, m.competency
+    ORDER BY s.name, s.student_id, m.competency
+'''
+
+STUDENT_DAILY_ACTIVITY_SQL = '''
+    SELECT dp.daily_progress_id, dp.material_id, dp.day_number, dp.completed,
+           dp.parent_comments, dp.completed_at, m.title, m.competency,
+           df.feedback, df.created_at
+    FROM daily_progress dp
+    JOIN materials m ON dp.material_id = m.material_id
+    LEFT JOIN daily_feedback df ON df.daily_progress_id = dp.daily_progress_id
+    WHERE dp.student_id = ?
+    ORDER BY m.uploaded_at DESC, dp.material_id, dp.day_number, dp.rowid, df.created_at DESC
+'''
+
+VALIDATE_SESSION_SQL = '''
+    SELECT username, user_type, expires_at FROM sessions
+    WHERE session_id = ? AND expires_at > ?
+'''
+
+DELETE_EXPIRED_SESSIONS_SQL = '''
+    DELETE FROM sessions WHERE expires_at < ?
+'''
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+import db
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A freshly migrated database, with its connection pool closed afterwards"""
+    path = str(tmp_path / 'remedial_platform.db')
+    db.migrate(path)
+    yield path
+    db.close_pool(path)
@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+import db
+
+pytest.importorskip('numpy')
+pytest.importorskip('streamlit')
+
+import analytics
+
+
+def test_app4_assessments_reach_class_analytics(db_path, tmp_path, monkeypatch):
+    # app4 migrates its relative DB_NAME on import; keep that out of the checkout
+    monkeypatch.chdir(tmp_path)
+    import app4
+    monkeypatch.setattr(app4, 'DB_NAME', db_path)
+    with db.get_connection(db_path) as conn:
+        conn.execute('''
+            INSERT INTO students (student_id, name, grade, teacher, parent)
+            VALUES ('S1', 'Student 1', '3', 'teacher1', 'parent1')
+        ''')
+
+    app4.save_assessment('A1', 'S1', 'teacher1', {'Reading': 30, 'Numbers': 70}, '')
+    time.sleep(1.1)  # created_at has one-second resolution
+    app4.save_assessment('A2', 'S1', 'teacher1', {'Reading': 50, 'Numbers': 60}, '')
+
+    result = analytics.class_competency_analytics(db_path, 'teacher1')
+
+    rows = {row['competency']: row for row in result['competencies']}
+    assert result['students'] == ['S1']
+    assert rows['Reading']['mean'] == 50
+    assert rows['Reading']['mean_delta'] == 20
+    assert rows['Numbers']['mean_delta'] == -10
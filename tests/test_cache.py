@@ -0,0 +1,38 @@
+import time
+
+import cache
+
+
+def test_set_purges_expired_entries_when_full():
+    ttl_cache = cache.TTLCache(max_entries=100)
+    for i in range(100):
+        ttl_cache.set(('validate_session', i), {'username': f'u{i}'}, ttl=0.01)
+    time.sleep(0.02)
+
+    ttl_cache.set(('validate_session', 'live'), {'username': 'live'}, ttl=60)
+
+    assert len(ttl_cache) == 1
+    assert ttl_cache.get(('validate_session', 'live')) == (True, {'username': 'live'})
+
+
+def test_entries_stay_bounded_when_all_are_live():
+    ttl_cache = cache.TTLCache(max_entries=100)
+    for i in range(5000):
+        ttl_cache.set(('validate_session', i), i, ttl=60)
+
+    assert len(ttl_cache) <= 100
+    # The newest entries survive, the oldest are dropped first
+    assert ttl_cache.get(('validate_session', 4999)) == (True, 4999)
+    assert ttl_cache.get(('validate_session', 0)) == (False, None)
+
+
+def test_eviction_history_is_bounded_and_still_blocks_racing_reads():
+    ttl_cache = cache.TTLCache()
+    token = ttl_cache.token()
+    for i in range(cache.EVICTION_HISTORY + 50):
+        ttl_cache.invalidate(('session', i))
+
+    assert len(ttl_cache._evicted_at) == cache.EVICTION_HISTORY
+    # The eviction of key 0 was forgotten, but a read that started before it is still refused
+    ttl_cache.set(('session', 0), 'stale', 60, token)
+    assert ttl_cache.get(('session', 0)) == (False, None)
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+
+import db
+
+
+def _insert_user(conn, username):
+    conn.execute('''
+        INSERT INTO users (username, password, user_type, full_name) VALUES (?, 'x', 'teacher', 'T')
+    ''', (username,))
+    return username
+
+
+def _committed_users(db_path):
+    # A separate connection only sees committed rows
+    with sqlite3.connect(db_path) as conn:
+        return [row[0] for row in conn.execute('SELECT username FROM users ORDER BY username')]
+
+
+def test_on_commit_runs_after_commit_and_before_result(db_path):
+    seen = []
+    future = db.submit_write(db_path, _insert_user, 't1',
+                             on_commit=lambda result: seen.append((result, _committed_users(db_path))))
+
+    assert future.result() == 't1'
+    assert seen == [('t1', ['t1'])]
+
+
+def test_on_commit_is_skipped_when_the_write_fails(db_path):
+    seen = []
+    db.submit_write(db_path, _insert_user, 't1').result()
+    future = db.submit_write(db_path, _insert_user, 't1', on_commit=seen.append)
+
+    assert isinstance(future.exception(), sqlite3.IntegrityError)
+    assert seen == []
+
+
+def test_nested_submit_write_is_rejected(db_path):
+    seen = []
+    with db.get_connection(db_path):
+        with pytest.raises(RuntimeError):
+            db.submit_write(db_path, _insert_user, 't1', on_commit=seen.append)
+
+    assert seen == []
+    assert _committed_users(db_path) == []
+    # The outer connection was released normally, so later writes still work
+    assert db.submit_write(db_path, _insert_user, 't2').result() == 't2'
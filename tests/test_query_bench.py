@@ -0,0 +1,13 @@
+import pytest
+
+from query_bench import percentile
+
+
+@pytest.mark.parametrize('pct, expected', [(0, 1), (20, 1), (50, 3), (60, 3), (95, 5), (99, 5), (100, 5)])
+def test_percentile_is_nearest_rank(pct, expected):
+    assert percentile([1, 2, 3, 4, 5], pct) == expected
+
+
+def test_percentile_of_even_length():
+    assert percentile([10, 20, 30, 40], 50) == 20
+    assert percentile([10, 20, 30, 40], 75) == 30